@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""Expanded cells and wall time of A* against the previous implementation.
+
+Mazes are made imperfect by removing deadends - the lower the level, the more
+loops. The bfs path length is the shortest path for reference.
+
+    $ python benchmarks/bench_astar.py
+    $ python benchmarks/bench_astar.py --sizes 50 100 200 --levels 2 6
+"""
+
+import os
+import sys
+import math
+import time
+import logging
+import argparse
+import heapq as h
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'maze'))
+
+import searches  # noqa: E402
+from maze import Maze  # noqa: E402
+
+
+def legacy_astar(grid, start_cell, exit_cell, tiebreak=False, budget=10**6):
+    """The previous A* implementation, kept verbatim for comparison apart from
+    giving up after budget expansions. It scores neighbours with the heuristic
+    of the current cell and re-expands duplicate entries, so the path it finds
+    is not guaranteed to be the shortest - compare the lengths to bfs.
+
+    A* search with Manhattan distance due to maze restriction
+
+    f(n) = g(n) + h(h)
+
+    g(n): path cost
+    h(n): heuristic approximation
+
+    Tiebreak is implemented to create bias for current picked path if there are equal paths
+    """
+    start_time = time.perf_counter()
+    parent = searches.new_parents(grid)
+    ucs_cost = {start_cell: 0}
+    expanded = 0
+
+    total_cells = grid.size
+    visited = set()
+    unvisited = [(0, start_cell)]
+
+    while len(visited) < total_cells:
+        astar_cost, curr = h.heappop(unvisited)
+        expanded += 1
+        if expanded > budget:
+            break
+
+        # break if we have found the exit
+        # this will be always the shortest path to exit
+        # due to the priority queue and checking only after
+        # all neighbours have been pushed!
+        if curr == exit_cell:
+            logging.debug("A* path search: Exit found")
+            break
+
+        # f(n) = g(n) + h(n) == f_cost
+        g_cost = ucs_cost[curr] + 1
+        h_cost = searches.manhattan(grid, curr, exit_cell)
+        h_cost *= (1.0 + 1/1000) if tiebreak else h_cost
+        f_cost = g_cost + h_cost
+
+        for n in grid.path_neighbours(curr):
+            if n not in visited:
+                # replace the larger of the accumulated path cost
+                if ucs_cost.get(n, math.inf) > g_cost:
+                    ucs_cost[n] = g_cost
+                parent[n] = curr
+                # we use the f(n) cost for sorting in the priority queue
+                h.heappush(unvisited, (f_cost, n))
+
+        # mark as visited
+        visited.add(curr)
+
+    return searches.search_result("A*", grid, parent, curr, exit_cell, expanded, start_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="A* benchmark against the previous implementation")
+    parser.add_argument("--sizes",
+                        nargs='*',
+                        type=int,
+                        default=[50, 100, 200],
+                        help="Square maze dimensions to sweep")
+    parser.add_argument("--levels",
+                        nargs='*',
+                        type=int,
+                        default=[2, 6, 0],
+                        help="Deadend removal levels - 0 keeps the maze perfect")
+    parser.add_argument("--budget",
+                        type=int,
+                        default=10**6,
+                        help="Give up the previous implementation after this many expansions")
+    parser.add_argument("--seed",
+                        type=int,
+                        default=0,
+                        help="Maze seed")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print("{0:>6} {1:>6} {2:>10} {3:>10} {4:>8} {5:>10} {6:>10} {7:>8} {8:>8}".format(
+        "size", "level", "old exp", "old sec", "old len", "new exp", "new sec", "new len", "bfs len"))
+    for size in args.sizes:
+        for level in args.levels:
+            maze = Maze(size, size, [0, 0], [size-1, size-1], seed=args.seed)
+            maze.generate('prim')
+            if level:
+                maze.remove_deadends('bfs', level)
+
+            start = time.perf_counter()
+            old = legacy_astar(maze.grid, maze.start, maze.exit, budget=args.budget)
+            old_time = time.perf_counter() - start
+            new = searches.astar(maze.grid, maze.start, maze.exit)
+            shortest = searches.bfs(maze.grid, maze.start, maze.exit)
+
+            old_expanded = old.expanded if old.expanded <= args.budget else ">{0}".format(args.budget)
+            print("{0:>6} {1:>6} {2:>10} {3:>10.4f} {4:>8} {5:>10} {6:>10.4f} {7:>8} {8:>8}".format(
+                size, level, old_expanded, old_time, old.length, new.expanded, new.time, new.length, shortest.length))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Generation time of the maze algorithms across maze sizes.
+
+The time per cell should stay roughly flat as the maze grows - anything
+growing with the dimension is a sign of a quadratic scan sneaking back in.
+
+    $ python benchmarks/bench_generation.py
+    $ python benchmarks/bench_generation.py --maze-type dfs --sizes 100 500 1000 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'maze'))
+
+from maze import Maze  # noqa: E402
+
+
+GENERATORS = {
+    'dfs': Maze.gen_dfs_maze,
+    'prim': Maze.gen_mod_prim_maze,
+    'kruskal': Maze.gen_kruskal_maze,
+    'wilson': Maze.gen_wilson_maze,
+    'binary-tree': lambda maze: maze.gen_row_maze('binary-tree'),
+    'sidewinder': lambda maze: maze.gen_row_maze('sidewinder'),
+    'eller': lambda maze: maze.gen_row_maze('eller'),
+}
+
+
+def time_generation(maze_type, size, seed=0):
+    """Generate a size x size maze and return the elapsed wall time"""
+    maze = Maze(size, size, [0, 0], [size-1, size-1], seed=seed)
+    start = time.perf_counter()
+    GENERATORS[maze_type](maze)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maze generation scaling benchmark")
+    parser.add_argument("-m", "--maze-type",
+                        choices=sorted(GENERATORS),
+                        default='dfs',
+                        help="Maze generation algorithm to benchmark")
+    parser.add_argument("--sizes",
+                        nargs='*',
+                        type=int,
+                        default=[100, 250, 500, 1000, 2000],
+                        help="Square maze dimensions to sweep")
+    args = parser.parse_args()
+
+    print("{0:>6} {1:>10} {2:>10} {3:>12}".format("size", "cells", "seconds", "usec/cell"))
+    for size in args.sizes:
+        elapsed = time_generation(args.maze_type, size)
+        cells = size * size
+        print("{0:>6} {1:>10} {2:>10.3f} {3:>12.3f}".format(size, cells, elapsed, 1e6 * elapsed / cells))
+
+
+if __name__ == "__main__":
+    main()
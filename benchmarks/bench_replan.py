@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""Latency of repairing a path with LPA* against searching again with A*.
+
+After the first plan, random walls are broken (and a share put back) and the
+planner repairs the path after each batch of changes. The path lengths are
+checked against A* on the changed maze.
+
+    $ python benchmarks/bench_replan.py
+    $ python benchmarks/bench_replan.py --sizes 100 300 --updates 50 --changes 1 10
+"""
+
+import os
+import sys
+import random
+import logging
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'maze'))
+
+from maze import Maze  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LPA* path repair against A* from scratch")
+    parser.add_argument("--sizes",
+                        nargs='*',
+                        type=int,
+                        default=[100, 200, 300],
+                        help="Square maze dimensions to sweep")
+    parser.add_argument("--changes",
+                        nargs='*',
+                        type=int,
+                        default=[1, 10],
+                        help="Wall changes per update")
+    parser.add_argument("--updates",
+                        type=int,
+                        default=20,
+                        help="Number of updates per maze")
+    parser.add_argument("--level",
+                        type=int,
+                        default=3,
+                        help="Deadend removal level - 0 keeps the maze perfect")
+    parser.add_argument("--seed",
+                        type=int,
+                        default=0,
+                        help="Maze seed")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    print("{0:>6} {1:>8} {2:>10} {3:>10} {4:>10} {5:>10}".format(
+        "size", "changes", "lpa* exp", "lpa* ms", "a* exp", "a* ms"))
+    for size in args.sizes:
+        for changes in args.changes:
+            maze = Maze(size, size, [0, 0], [size-1, size-1], seed=args.seed)
+            maze.generate('prim')
+            if args.level:
+                maze.remove_deadends('bfs', args.level)
+            rng = random.Random(args.seed)
+            grid = maze.grid
+
+            with maze.planner() as planner:
+                planner.replan()
+                lpa_expanded = lpa_time = astar_expanded = astar_time = 0
+                for _ in range(args.updates):
+                    for _ in range(changes):
+                        i = rng.randrange(grid.size)
+                        n = rng.choice(grid.get_neighbours(i))
+                        if rng.random() < 0.25:
+                            maze.add_wall(i, n)
+                        else:
+                            maze.break_wall(i, n)
+                    repaired = planner.replan()
+                    searched = maze.solve('a*')
+                    if repaired.length != searched.length:
+                        sys.exit("Path length mismatch: LPA* {0}, A* {1}".format(repaired.length, searched.length))
+                    lpa_expanded += repaired.expanded
+                    lpa_time += repaired.time
+                    astar_expanded += searched.expanded
+                    astar_time += searched.time
+
+            n = args.updates
+            print("{0:>6} {1:>8} {2:>10.0f} {3:>10.3f} {4:>10.0f} {5:>10.3f}".format(
+                size, changes, lpa_expanded / n, 1000 * lpa_time / n, astar_expanded / n, 1000 * astar_time / n))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""Every generator, deadend remover and search across maze sizes.
+
+Each case is generated, broken and solved with a fixed seed, so the counts
+are the same from run to run and only the times and memory vary. Times are
+the best of --repeat runs, the peak memory and the counts come from one more
+run with metrics.recorder and allocation tracing on (tracemalloc slows the
+code down, so it never runs while timing).
+
+The results are written as JSON. Pass an earlier results file as the
+baseline and any case that got slower or bigger beyond the tolerance, or
+whose counts changed, is reported and the run fails:
+
+    $ python benchmarks/bench_suite.py -o baseline.json
+    $ python benchmarks/bench_suite.py -o results.json --baseline baseline.json
+    $ python benchmarks/bench_suite.py --sizes 10 100 1000 4000 --maze-types prim eller -s a* jps
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'maze'))
+
+import metrics  # noqa: E402
+import searches  # noqa: E402
+from maze import Maze  # noqa: E402
+
+MAZE_TYPES = ['prim', 'dfs', 'kruskal', 'wilson', 'binary-tree', 'sidewinder', 'eller']
+SEARCH_TYPES = sorted(searches.path_searches) + ['corridor']
+
+# counts that only change when an algorithm does
+COUNTS = ('cells', 'pushes', 'pops', 'peak_frontier', 'path_length')
+
+
+def best_time(fn, repeat):
+    """The fastest wall time of repeat calls"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def new_maze(size, seed, walls=None):
+    return Maze(size, size, [0, 0], [size-1, size-1], seed=seed,
+                walls=bytearray(walls) if walls is not None else None)
+
+
+def run_case(size, maze_type, breaks, search_types, seed, repeat):
+    """Benchmark one size and generator - returns a result dict per phase"""
+    results = []
+
+    def add(key, seconds, stats, path_length=None):
+        case = {'size': size, 'maze_type': maze_type, 'break_type': key[0], 'level': key[1],
+                'phase': key[2], 'algorithm': key[3], 'seconds': seconds}
+        for name in ('cells', 'pushes', 'pops', 'peak_frontier', 'peak_bytes'):
+            case[name] = stats.get(name, 0)
+        if path_length is not None:
+            case['path_length'] = path_length
+        results.append(case)
+
+    def measured():
+        """Stats of the phases run since the last call"""
+        return {(s['phase'], s['algorithm']): s for s in metrics.recorder.drain()}
+
+    # generation - one traced run for the memory and counts, then timed runs
+    metrics.recorder.enable(trace_allocations=True)
+    maze = new_maze(size, seed)
+    maze.generate(maze_type)
+    metrics.recorder.disable()
+    stats = measured()[('generate', maze_type)]
+    seconds = best_time(lambda: new_maze(size, seed).generate(maze_type), repeat)
+    add(('', 0, 'generate', maze_type), seconds, stats)
+    walls = maze.grid.walls
+
+    for break_type, level in breaks:
+        broken = new_maze(size, seed, walls)
+        if level:
+            metrics.recorder.enable(trace_allocations=True)
+            broken.remove_deadends(break_type, level)
+            metrics.recorder.disable()
+            stats = measured()[('remove-deadends', break_type)]
+            seconds = best_time(lambda: new_maze(size, seed, walls).remove_deadends(break_type, level), repeat)
+            add((break_type, level, 'remove-deadends', break_type), seconds, stats)
+
+        for search_type in search_types:
+            metrics.recorder.enable(trace_allocations=True)
+            result = broken.solve(search_type)
+            metrics.recorder.disable()
+            stats = measured()[('search', search_type)]
+            # the corridor graph is cached by the maze, time it from scratch every run
+            seconds = min(new_maze(size, seed, broken.grid.walls).solve(search_type).time
+                          if search_type == 'corridor' else broken.solve(search_type).time
+                          for _ in range(repeat))
+            add((break_type, level, 'search', search_type), seconds, stats, result.length)
+    return results
+
+
+def case_key(case):
+    return (case['size'], case['maze_type'], case['break_type'], case['level'], case['phase'], case['algorithm'])
+
+
+def case_name(case):
+    name = "{0}x{0} {1}".format(case['size'], case['maze_type'])
+    if case['level']:
+        name += " {0}/{1}".format(case['break_type'], case['level'])
+    return name + " {0} {1}".format(case['phase'], case['algorithm'])
+
+
+def compare(results, baseline, tolerance, min_seconds, min_bytes):
+    """Check the results against a baseline - returns the failure messages"""
+    failures = []
+    base_cases = {case_key(case): case for case in baseline['results']}
+    for case in results:
+        base = base_cases.get(case_key(case))
+        if base is None:
+            continue
+        name = case_name(case)
+        for count in COUNTS:
+            if count in base and case.get(count) != base[count]:
+                failures.append("{0}: {1} changed from {2} to {3}".format(name, count, base[count], case.get(count)))
+        if case['seconds'] > base['seconds'] * (1 + tolerance) and case['seconds'] - base['seconds'] > min_seconds:
+            failures.append("{0}: {1:.2f}x slower ({2:.4f}s, was {3:.4f}s)".format(
+                name, case['seconds'] / base['seconds'], case['seconds'], base['seconds']))
+        if (case['peak_bytes'] > base['peak_bytes'] * (1 + tolerance)
+                and case['peak_bytes'] - base['peak_bytes'] > min_bytes):
+            failures.append("{0}: peak memory grew from {1} to {2} bytes".format(
+                name, base['peak_bytes'], case['peak_bytes']))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every generator, deadend remover and search")
+    parser.add_argument("--sizes",
+                        nargs='*',
+                        type=int,
+                        default=[10, 100, 300],
+                        help="Square maze dimensions to sweep, e.g. 10 100 1000 4000")
+    parser.add_argument("-m", "--maze-types",
+                        nargs='*',
+                        choices=MAZE_TYPES,
+                        default=MAZE_TYPES,
+                        help="Maze generation algorithms")
+    parser.add_argument("-b", "--break-types",
+                        nargs='*',
+                        choices=['bfs', 'dfs'],
+                        default=['bfs', 'dfs'],
+                        help="Deadend removal traversals")
+    parser.add_argument("--levels",
+                        nargs='*',
+                        type=int,
+                        default=[0, 6, 2],
+                        help="Deadend removal levels - 0 keeps the maze perfect")
+    parser.add_argument("-s", "--search-types",
+                        nargs='*',
+                        choices=SEARCH_TYPES,
+                        default=SEARCH_TYPES,
+                        help="Path search algorithms")
+    parser.add_argument("--seed",
+                        type=int,
+                        default=0,
+                        help="Seed of every maze")
+    parser.add_argument("--repeat",
+                        type=int,
+                        default=3,
+                        help="Timed runs per case, the fastest is kept")
+    parser.add_argument("-o", "--output",
+                        default='bench_results.json',
+                        help="File the results are written to")
+    parser.add_argument("--baseline",
+                        help="Results of an earlier run to compare against")
+    parser.add_argument("--tolerance",
+                        type=float,
+                        default=0.25,
+                        help="Allowed slowdown and memory growth over the baseline, 0.25 is 25%%")
+    parser.add_argument("--min-seconds",
+                        type=float,
+                        default=0.005,
+                        help="Slowdowns smaller than this are noise")
+    parser.add_argument("--min-bytes",
+                        type=int,
+                        default=65536,
+                        help="Memory growth smaller than this is noise")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    # a level 0 run keeps the maze perfect, so it is the same for every break type
+    breaks = [('', 0)] if 0 in args.levels else []
+    breaks += [(b, level) for b in args.break_types for level in args.levels if level]
+
+    results = []
+    print("{0:>6} {1:>12} {2:>8} {3:>16} {4:>12} {5:>10} {6:>12} {7:>10}".format(
+        "size", "maze", "break", "phase", "algorithm", "ms", "peak KiB", "cells"))
+    for size in args.sizes:
+        for maze_type in args.maze_types:
+            for case in run_case(size, maze_type, breaks, args.search_types, args.seed, args.repeat):
+                results.append(case)
+                print("{0:>6} {1:>12} {2:>8} {3:>16} {4:>12} {5:>10.3f} {6:>12.1f} {7:>10}".format(
+                    size, maze_type, "{0}/{1}".format(case['break_type'], case['level']) if case['level'] else '-',
+                    case['phase'], case['algorithm'], 1000 * case['seconds'], case['peak_bytes'] / 1024,
+                    case['cells']))
+
+    with open(args.output, 'w') as f:
+        json.dump({'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'seed': args.seed,
+                   'results': results}, f, indent=1)
+    print("Results written to {0}".format(args.output))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance, args.min_seconds, args.min_bytes)
+        if failures:
+            print("\n".join(failures))
+            sys.exit("{0} regressions against {1}".format(len(failures), args.baseline))
+        print("No regressions against {0}".format(args.baseline))
+
+
+if __name__ == "__main__":
+    main()
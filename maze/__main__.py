@@ -2,4 +2,4 @@ import maze
 
 
 if __name__ == "__main__":
-    maze.Main()
+    maze.main()
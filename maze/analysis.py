@@ -0,0 +1,63 @@
+"""Structure of a maze in a few linear passes - for grading how hard it is.
+
+The open sides of every cell come from one scan of the walls at C speed
+(Grid.open_sides) and are counted by degree. Two breadth first floods
+(distance.DistanceField) give the rest: the first, from the start cell, the
+solution length and whether every cell can be reached, the second, from the
+farthest cell of the first, the diameter. The floods are private to the call
+rather than taken from distance.fields, so their arrays are freed with it -
+Maze.analyze caches the stats instead.
+"""
+
+import collections
+import distance
+from grid import DIRECTIONS
+
+# the number of open sides of a mask
+_DEGREE = bytes(sum(1 for d in DIRECTIONS if b & d) for b in range(256))
+
+# the structure of a maze - cells are counted by their open sides: dead ends
+# have one, corridors two and junctions more, isolated cells none. Edges are
+# the open walls between cells and loops the independent cycles they add
+# over a spanning tree (edges - cells + 1), None if the maze isn't connected.
+# The diameter is the longest shortest path found by a double BFS between
+# diameter_ends - exact for perfect mazes, a lower bound with loops. The
+# solution length is -1 if the exit can't be reached from the start.
+MazeStats = collections.namedtuple('MazeStats',
+                                   ['cells', 'dead_ends', 'corridors', 'junctions', 'isolated', 'edges',
+                                    'loops', 'diameter', 'diameter_ends', 'solution_length',
+                                    'reachable', 'connected', 'perfect'])
+
+
+def analyze(grid, start_cell, exit_cell):
+    """Analyze the walls of a grid - returns a MazeStats"""
+    degrees = grid.open_sides().translate(_DEGREE)
+    isolated = degrees.count(0)
+    dead_ends = degrees.count(1)
+    corridors = degrees.count(2)
+    junctions = degrees.count(3) + degrees.count(4)
+    edges = (dead_ends + 2 * corridors + 3 * degrees.count(3) + 4 * degrees.count(4)) // 2
+
+    from_start = distance.DistanceField(grid, (start_cell,))
+    reachable = grid.size - from_start.distance.count(-1)
+    connected = reachable == grid.size
+    loops = edges - grid.size + 1 if connected else None
+
+    # the farthest cell from anywhere is an end of a longest path in a tree
+    end = from_start.farthest
+    from_end = distance.DistanceField(grid, (end,))
+    other_end = from_end.farthest
+
+    return MazeStats(cells=grid.size,
+                     dead_ends=dead_ends,
+                     corridors=corridors,
+                     junctions=junctions,
+                     isolated=isolated,
+                     edges=edges,
+                     loops=loops,
+                     diameter=from_end.distance_to(other_end),
+                     diameter_ends=(end, other_end),
+                     solution_length=from_start.distance_to(exit_cell),
+                     reachable=reachable,
+                     connected=connected,
+                     perfect=connected and loops == 0)
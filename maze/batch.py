@@ -0,0 +1,173 @@
+import os
+import json
+import time
+import logging
+import multiprocessing
+import maze_file
+import metrics
+from maze import Maze
+from maze_config_parser import MazeConfig
+
+
+# settings shared by every job - set once per worker process by the pool initializer
+_settings = None
+
+
+def init_worker(settings):
+    global _settings
+    _settings = settings
+    # the per-maze search logging is meant for interactive use
+    logging.disable(logging.INFO)
+    if settings['metrics']:
+        metrics.recorder.enable(settings['trace_allocations'])
+
+
+def generate_one(job):
+    """Generate, break and solve a single maze - runs in a worker process.
+
+    Args:
+        job (tuple): The (index, seed) of the maze within the batch.
+
+    Returns a JSON serializable record of the maze and its search results.
+    """
+    index, seed = job
+    s = _settings
+
+    t0 = time.perf_counter()
+    maze = Maze(s['rows'], s['cols'], s['start_cell'], s['exit_cell'], seed=seed)
+    maze.generate(s['maze_type'])
+    t1 = time.perf_counter()
+    if s['braid'] is not None:
+        maze.braid(s['braid'])
+    else:
+        maze.remove_deadends(s['break_type'])
+    if s['terrain']:
+        maze.gen_terrain(s['terrain'], *s['terrain_range'])
+    t2 = time.perf_counter()
+
+    results = {}
+    for search_type in s['search_types']:
+        result = maze.solve(search_type)
+        results[search_type] = {'expanded': result.expanded, 'path_length': result.length,
+                                'path_cost': result.cost}
+    t3 = time.perf_counter()
+
+    record = {
+        'index': index,
+        'seed': seed,
+        'rows': maze.rows,
+        'cols': maze.cols,
+        'start': list(maze.start_coords),
+        'exit': list(maze.exit_coords),
+        'maze_type': s['maze_type'],
+        'break_type': s['break_type'],
+        'braid': s['braid'],
+        'terrain': s['terrain'],
+        'time': {'generate': t1 - t0, 'break': t2 - t1, 'search': t3 - t2},
+        'searches': results,
+    }
+    if s['analyze']:
+        record['analysis'] = maze.analyze()._asdict()
+    if s['format'] == 'pack':
+        # serialized in the worker so the parent only has to append bytes
+        record['data'] = maze_file.dumps(maze)
+    else:
+        record['walls'] = maze.grid.walls.hex()
+    if s['metrics']:
+        # merged into the recorder of the parent process, see run_batch
+        record['metrics'] = metrics.recorder.drain()
+    return record
+
+
+def run_batch(settings, count, workers, seed_base, output):
+    """Generate count mazes over a pool of workers, streaming them to output.
+
+    Maze i is generated with seed seed_base + i so every maze of a batch can be
+    reproduced on its own. Records are written in the order they finish, either
+    as JSON lines or appended to a binary maze pack (settings['format']).
+
+    Returns the number of mazes per second.
+    """
+    jobs = ((i, seed_base + i) for i in range(count))
+    # big enough chunks to amortize the IPC, small enough to balance the workers
+    chunksize = max(1, count // (workers * 16))
+    report_every = max(1, count // 10)
+
+    start = time.perf_counter()
+    done = 0
+    pack = settings['format'] == 'pack'
+    with (maze_file.MazeWriter(output) if pack else open(output, 'w')) as f:
+        if workers > 1:
+            pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(settings,))
+            records = pool.imap_unordered(generate_one, jobs, chunksize)
+        else:
+            pool = None
+            init_worker(settings)
+            records = map(generate_one, jobs)
+
+        try:
+            for record in records:
+                if 'metrics' in record:
+                    metrics.recorder.merge(record.pop('metrics'))
+                if pack:
+                    f.write_record(record['data'])
+                else:
+                    f.write(json.dumps(record) + '\n')
+                done += 1
+                if done % report_every == 0:
+                    elapsed = time.perf_counter() - start
+                    print("Batch: {0}/{1} mazes, {2:.1f} mazes/sec".format(done, count, done / elapsed))
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+            else:
+                logging.disable(logging.NOTSET)
+
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else float('inf')
+    print("Generated {0} mazes in {1:.2f}s with {2} workers: {3:.1f} mazes/sec".format(done, elapsed, workers, rate))
+    if settings['metrics']:
+        metrics.recorder.save(settings['metrics'])
+    return rate
+
+
+def main(argv=None):
+    config = MazeConfig()
+
+    # if config.yaml exists - use it
+    yaml_config_file = os.path.abspath(os.curdir) + '/config.yaml'
+    if os.path.exists(yaml_config_file):
+        config.process_yaml_file(yaml_config_file)
+
+    config.process_cmd_args(argv, batch=True)
+
+    logging.basicConfig(format='%(levelname)s: %(message)s',
+                        level=config.maze_logging)
+
+    start_cell = config.adjust_cell(config.maze_start_cell, True)
+    exit_cell = config.adjust_cell(config.maze_exit_cell, False)
+    if start_cell == exit_cell:
+        start_cell, exit_cell = config.reset_to_defaults(start_cell, exit_cell)
+
+    settings = {
+        'rows': config.maze_dimension[0],
+        'cols': config.maze_dimension[1],
+        'start_cell': start_cell,
+        'exit_cell': exit_cell,
+        'maze_type': config.maze_type,
+        'break_type': config.maze_break_type,
+        'braid': config.maze_braid,
+        'analyze': config.maze_analyze,
+        'search_types': config.maze_search_type,
+        'terrain': config.maze_terrain,
+        'terrain_range': config.maze_terrain_range,
+        'format': config.batch_format,
+        'metrics': config.maze_metrics,
+        'trace_allocations': config.maze_trace_allocations,
+    }
+    run_batch(settings,
+              config.batch_count,
+              max(1, config.batch_workers),
+              config.batch_seed_base,
+              config.batch_output)
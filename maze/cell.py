@@ -1,8 +1,38 @@
-import math
+from grid import NORTH, EAST, SOUTH, WEST
+
+
+def _wall(direction):
+    """Property reading/writing a single wall bit of the underlying grid"""
+
+    def getter(self):
+        return bool(self.grid.walls[self.index] & direction)
+
+    def setter(self, value):
+        if value:
+            self.grid.walls[self.index] |= direction
+        else:
+            self.grid.walls[self.index] &= ~direction
+        self.grid.version += 1
+
+    return property(getter, setter)
+
+
+def _neighbour(direction):
+    """Property retrieving the neighbour cell or None at the maze edge"""
+
+    def getter(self):
+        n = self.grid.neighbour(self.index, direction)
+        return Cell(self.grid, n) if n >= 0 else None
+
+    return property(getter)
 
 
 class Cell:
-    """A cell that is part of a maze keep track of various state information.
+    """A lazy view onto a single cell of a Grid.
+
+    The maze state lives in the flat arrays of the grid, a Cell only holds
+    the index so it is cheap to create and throw away. Two views of the
+    same cell compare equal.
 
     It consists of the following:
         * 4 walls
@@ -11,86 +41,93 @@ class Cell:
     Also contains helper functions for maze and path generation.
 
     Args:
-        coords (tuple): The coordinates on the cell.
+        grid (Grid):  The grid the cell is part of.
+        index (int):  The flat index of the cell in the grid.
 
     """
 
-    def __init__(self, coords):
+    __slots__ = ('grid', 'index', 'coords', 'x', 'y')
 
-        # Pointers to other cells or 'edge' cells
-        self.north_cell = None
-        self.east_cell = None
-        self.south_cell = None
-        self.west_cell = None
+    def __init__(self, grid, index):
+        self.grid = grid
+        self.index = index
 
-        # Every cell are walled off initially
-        self.north_wall = True
-        self.east_wall = True
-        self.south_wall = True
-        self.west_wall = True
+        # store the co-ords as a tuple
+        self.coords = grid.coords(index)
+        self.x = self.coords[0]
+        self.y = self.coords[1]
 
-        self.neighbours = []
-        self.tmp_path = False
-        self.parent = None
-        self.ucs_cost = math.inf
-        self.astar_cost = math.inf
+    north_wall = _wall(NORTH)
+    east_wall = _wall(EAST)
+    south_wall = _wall(SOUTH)
+    west_wall = _wall(WEST)
 
-        # store the co-ords as a tuple
-        self.coords = coords
-        self.x = coords[0]
-        self.y = coords[1]
+    north_cell = _neighbour(NORTH)
+    east_cell = _neighbour(EAST)
+    south_cell = _neighbour(SOUTH)
+    west_cell = _neighbour(WEST)
+
+    @property
+    def tmp_path(self):
+        return bool(self.grid.path[self.index])
+
+    @tmp_path.setter
+    def tmp_path(self, value):
+        self.grid.path[self.index] = 1 if value else 0
+
+    def __eq__(self, other):
+        return isinstance(other, Cell) and self.grid is other.grid and self.index == other.index
+
+    def __hash__(self):
+        return hash(self.index)
 
     def __lt__(self, other):
         """Compare function for heapq - use coordinates"""
         return self.coords < other.coords
 
-    def add_north(self, neighbour):
-        self.north_cell = neighbour
-
-    def add_east(self, neighbour):
-        self.east_cell = neighbour
-
-    def add_south(self, neighbour):
-        self.south_cell = neighbour
+    def __repr__(self):
+        return "Cell{0}".format(self.coords)
 
-    def add_west(self, neighbour):
-        self.west_cell = neighbour
+    def _cells(self, indices):
+        return [Cell(self.grid, i) for i in indices]
 
     def wall_neighbours(self):
         """Return a list of neighbour cells that have a wall between the current cell"""
-        w = []
-        if self.north_wall and self.north_cell:
-            w.append(self.north_cell)
-        if self.east_wall and self.east_cell:
-            w.append(self.east_cell)
-        if self.south_wall and self.south_cell:
-            w.append(self.south_cell)
-        if self.west_wall and self.west_cell:
-            w.append(self.west_cell)
-        return w
+        return self._cells(self.grid.wall_neighbours(self.index))
 
     def path_neighbours(self):
         """Retrieve a list of neighbours which a path/link exists"""
-        neighbours = []
-        if self.north_cell and not self.north_wall:
-            neighbours.append(self.north_cell)
-        if self.east_cell and not self.east_wall:
-            neighbours.append(self.east_cell)
-        if self.south_cell and not self.south_wall:
-            neighbours.append(self.south_cell)
-        if self.west_cell and not self.west_wall:
-            neighbours.append(self.west_cell)
-        return neighbours
+        return self._cells(self.grid.path_neighbours(self.index))
 
     def get_neighbours(self):
         """Retrieve a list of neighbours; regardless whether a wall exists"""
-        neighbours = []
-        if self.north_cell:
-            neighbours.append(self.north_cell)
-        if self.east_cell:
-            neighbours.append(self.east_cell)
-        if self.south_cell:
-            neighbours.append(self.south_cell)
-        if self.west_cell:
-            neighbours.append(self.west_cell)
-        return neighbours
+        return self._cells(self.grid.get_neighbours(self.index))
+
+
+class CellList:
+    """Lazy 2D view of a grid - cell_list[r][c] returns a Cell view"""
+
+    def __init__(self, grid):
+        self.grid = grid
+
+    def __len__(self):
+        return self.grid.rows
+
+    def __getitem__(self, r):
+        if not 0 <= r < self.grid.rows:
+            raise IndexError(r)
+        return _CellRow(self.grid, r)
+
+
+class _CellRow:
+    def __init__(self, grid, r):
+        self.grid = grid
+        self.offset = r * grid.cols
+
+    def __len__(self):
+        return self.grid.cols
+
+    def __getitem__(self, c):
+        if not 0 <= c < self.grid.cols:
+            raise IndexError(c)
+        return Cell(self.grid, self.offset + c)
@@ -0,0 +1,182 @@
+import math
+import time
+import heapq as h
+import logging
+import searches
+from steps import EXPANDED, FRONTIER, STALE, run
+
+
+class CorridorGraph:
+    """A maze compressed into a weighted graph of junctions and dead ends.
+
+    Every cell that doesn't have exactly two open sides is a node, as are the
+    cells passed in as extra nodes, e.g. the start and exit. The runs of
+    two-sided cells between nodes are corridors which become edges weighted by
+    their length, so a search only has to expand the nodes and the corridors
+    are walked again just for the final path.
+
+    Each node keeps a list of its edges (other node, steps, interior cost,
+    first cell) where the first cell is the corridor cell next to the node, or
+    the other node itself for adjacent nodes. The interior cost is the terrain
+    cost of the corridor cells, without a terrain layer the steps are the cost.
+
+    Args:
+        grid (Grid):      The grid to compress.
+        extra (iterable): Cells to keep as nodes regardless of their sides.
+
+    """
+
+    def __init__(self, grid, extra=()):
+        self.grid = grid
+        self.version = grid.version
+        self.costs = grid.costs
+        self.edges = {}
+        self._build(extra)
+
+    def _build(self, extra):
+        grid = self.grid
+        edges = self.edges
+        path_neighbours = grid.path_neighbours
+        for i in range(grid.size):
+            if len(path_neighbours(i)) != 2:
+                edges[i] = []
+        for i in extra:
+            edges[i] = []
+        for node, node_edges in edges.items():
+            for first in path_neighbours(node):
+                node_edges.append(self._walk(node, first)[:4])
+
+    def __len__(self):
+        return len(self.edges)
+
+    def is_current(self, grid):
+        """Whether the graph still matches the walls and terrain of the grid"""
+        return self.grid is grid and self.version == grid.version and self.costs is grid.costs
+
+    def _walk(self, node, first):
+        """Follow a corridor from node through first to the next node.
+
+        Returns (other node, steps, interior cost, first, cell before the
+        other node), the last being node itself for adjacent nodes.
+        """
+        edges = self.edges
+        costs = self.costs
+        path_neighbours = self.grid.path_neighbours
+        prev, curr = node, first
+        steps = 1
+        interior = 0
+        while curr not in edges:
+            interior += costs[curr] if costs is not None else 1
+            a, b = path_neighbours(curr)
+            prev, curr = curr, b if a == prev else a
+            steps += 1
+        return curr, steps, interior, first, prev
+
+    def corridor(self, node, first):
+        """The cells of the corridor from node through first, up to the next node"""
+        edges = self.edges
+        path_neighbours = self.grid.path_neighbours
+        cells = []
+        prev, curr = node, first
+        while curr not in edges:
+            cells.append(curr)
+            a, b = path_neighbours(curr)
+            prev, curr = curr, b if a == prev else a
+        cells.append(curr)
+        return cells
+
+    def add_node(self, cell):
+        """Make a corridor cell a node by splitting its corridor in two"""
+        edges = self.edges
+        if cell in edges:
+            return
+        # a node before walking, so a corridor closed on itself leads back to cell
+        edges[cell] = []
+        ends = [self._walk(cell, first) for first in self.grid.path_neighbours(cell)]
+        # a corridor closed on itself without any node - the cell only joins itself
+        if ends[0][0] == cell:
+            return
+        for other, steps, interior, first, before in ends:
+            # the edge of the other end that ran through this cell is replaced
+            edges[other] = [e for e in edges[other] if e[3] != before]
+            edges[other].append(self._walk(other, before)[:4])
+            edges[cell].append((other, steps, interior, first))
+
+    def break_wall(self, i, j):
+        """Update the graph for a wall about to be broken between cells i and j.
+
+        Both cells become nodes joined by a one step edge. Call before the
+        wall is removed from the grid, then mark_current() after it.
+        """
+        d = self.grid.direction(i, j)
+        if not d or not self.grid.walls[i] & d:
+            return
+        self.add_node(i)
+        self.add_node(j)
+        self.edges[i].append((j, 1, 0, j))
+        self.edges[j].append((i, 1, 0, i))
+
+    def mark_current(self):
+        self.version = self.grid.version
+
+    def search(self, start_cell, exit_cell):
+        """A* over the nodes - returns a searches.SearchResult, see search_steps"""
+        return run(self.search_steps(start_cell, exit_cell))
+
+    def search_steps(self, start_cell, exit_cell):
+        """A* over the nodes as step events - the SearchResult with the full path
+        is the return value, only nodes are expanded.
+
+        Corridors are at least as long as the manhattan distance between their
+        ends, so manhattan stays a consistent heuristic over the graph.
+        """
+        start_time = time.perf_counter()
+        grid = self.grid
+        self.add_node(start_cell)
+        self.add_node(exit_cell)
+
+        edges = self.edges
+        costs = self.costs
+        # the (node, first cell) of the edge each node was reached by, to rebuild the corridors
+        parent = {start_cell: None}
+        g_costs = {start_cell: 0}
+        closed = bytearray(grid.size)
+        expanded = 0
+        unvisited = [(searches.manhattan(grid, start_cell, exit_cell), start_cell)]
+        yield FRONTIER, unvisited, 0
+
+        curr = start_cell
+        while unvisited:
+            f_cost, curr = h.heappop(unvisited)
+            if closed[curr]:
+                yield STALE, curr, -1
+                continue
+            expanded += 1
+            yield EXPANDED, curr, -1
+            if curr == exit_cell:
+                logging.debug("Corridor path search: Exit found")
+                break
+            closed[curr] = 1
+
+            g_curr = g_costs[curr]
+            for n, steps, interior, first in edges[curr]:
+                # following an edge costs its interior and the other node
+                g_cost = g_curr + (interior + costs[n] if costs is not None else steps)
+                if not closed[n] and g_cost < g_costs.get(n, math.inf):
+                    g_costs[n] = g_cost
+                    parent[n] = (curr, first)
+                    h.heappush(unvisited, (g_cost + searches.manhattan(grid, n, exit_cell), n))
+
+        path = []
+        if curr == exit_cell:
+            # walk the corridors of the found edges back to the start
+            runs = []
+            node = curr
+            while parent[node] is not None:
+                prev, first = parent[node]
+                runs.append(self.corridor(prev, first))
+                node = prev
+            path = [start_cell]
+            for cells in reversed(runs):
+                path.extend(cells)
+        return searches.path_result("Corridor", grid, path, expanded, start_time)
@@ -0,0 +1,140 @@
+import collections
+from array import array
+
+
+class DistanceField:
+    """Distances from one or more source cells to every cell of a grid.
+
+    One BFS flood fills flat arrays of distances and parents, after that the
+    distance to any cell is a lookup and the path to it a walk along the
+    parents. With several sources every cell is reached from its nearest one.
+    Distances are in steps - terrain costs are not taken into account.
+
+    Args:
+        grid (Grid):      The grid to flood.
+        sources (tuple):  The indices of the source cells.
+
+    """
+
+    def __init__(self, grid, sources):
+        self.sources = tuple(sources)
+        self.grid_id = grid.id
+        self.version = grid.version
+        # -1 marks cells that can't be reached, and the sources in parent
+        self.distance = array('i', [-1]) * grid.size
+        self.parent = array('i', [-1]) * grid.size
+        self.farthest = self._flood(grid)
+
+    def _flood(self, grid):
+        """Breadth first flood a level at a time - returns the last cell reached"""
+        distance = self.distance
+        parent = self.parent
+        path_neighbours = grid.path_neighbours
+
+        frontier = []
+        for s in self.sources:
+            if distance[s] < 0:
+                distance[s] = 0
+                frontier.append(s)
+        last = frontier[-1] if frontier else -1
+
+        d = 0
+        while frontier:
+            d += 1
+            next_frontier = []
+            for curr in frontier:
+                for n in path_neighbours(curr):
+                    if distance[n] < 0:
+                        distance[n] = d
+                        parent[n] = curr
+                        next_frontier.append(n)
+            if next_frontier:
+                last = next_frontier[-1]
+            frontier = next_frontier
+        return last
+
+    def is_current(self, grid):
+        """Whether the field still matches the walls of the grid"""
+        return self.grid_id == grid.id and self.version == grid.version
+
+    def distance_to(self, target):
+        """Steps from the nearest source to the target, -1 if it can't be reached"""
+        return self.distance[target]
+
+    def source_of(self, target):
+        """The source nearest to the target, -1 if it can't be reached"""
+        if self.distance[target] < 0:
+            return -1
+        parent = self.parent
+        while parent[target] >= 0:
+            target = parent[target]
+        return target
+
+    def path_to(self, target):
+        """Shortest path from the nearest source to the target - empty if unreachable.
+
+        Runs in O(path length), the path is the same as BFS would find.
+        """
+        if self.distance[target] < 0:
+            return []
+        parent = self.parent
+        path = [target]
+        while parent[target] >= 0:
+            target = parent[target]
+            path.append(target)
+        path.reverse()
+        return path
+
+    def path_from(self, target):
+        """Shortest path from the target back to its nearest source"""
+        path = self.path_to(target)
+        path.reverse()
+        return path
+
+
+class FieldCache:
+    """Least recently used cache of distance fields keyed by grid id and sources.
+
+    A field is rebuilt when the walls of its grid changed since it was flooded.
+    Every field holds two int32 arrays of the grid size, so maxsize bounds the
+    memory used to about 8 * maxsize bytes per cell.
+
+    Args:
+        maxsize (int): The number of fields kept.
+
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self.fields = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.fields)
+
+    def get(self, grid, sources):
+        """The distance field of the grid from a source index or an iterable of them"""
+        sources = (sources,) if isinstance(sources, int) else tuple(sorted(set(sources)))
+        key = (grid.id, sources)
+
+        field = self.fields.get(key)
+        if field is not None and field.is_current(grid):
+            self.hits += 1
+            self.fields.move_to_end(key)
+            return field
+
+        self.misses += 1
+        field = DistanceField(grid, sources)
+        self.fields[key] = field
+        self.fields.move_to_end(key)
+        while len(self.fields) > self.maxsize:
+            self.fields.popitem(last=False)
+        return field
+
+    def clear(self):
+        self.fields.clear()
+
+
+# shared by every maze of the process
+fields = FieldCache()
@@ -0,0 +1,272 @@
+import itertools
+from array import array
+
+NORTH = 1
+EAST = 2
+SOUTH = 4
+WEST = 8
+ALL_WALLS = NORTH | EAST | SOUTH | WEST
+
+# neighbours are always visited in N, E, S, W order
+DIRECTIONS = (NORTH, EAST, SOUTH, WEST)
+OPPOSITE = {NORTH: SOUTH, EAST: WEST, SOUTH: NORTH, WEST: EAST}
+
+# translation tables for scanning the whole wall array at C speed
+_OPEN = bytes(~b & ALL_WALLS for b in range(256))
+_CLEAR = {d: bytes(b & ~d for b in range(256)) for d in DIRECTIONS}
+_SINGLE_SIDE = bytes(1 if b in DIRECTIONS else 0 for b in range(256))
+_LOW_NIBBLE = bytes(b & 0xF for b in range(256))
+_HIGH_NIBBLE = bytes(b >> 4 for b in range(256))
+
+
+def outer_edge(rows, cols, coords):
+    """The outer wall opened for a start/exit cell - 0 if the cell isn't on the boundary.
+
+    The west and east walls take precedence over the north and south ones.
+    """
+    r, c = coords
+    if c == 0:
+        return WEST
+    elif c == cols-1:
+        return EAST
+    elif r == 0:
+        return NORTH
+    elif r == rows-1:
+        return SOUTH
+    return 0
+
+
+# unique grid ids - unlike id() never reused, so safe as cache keys
+_grid_ids = itertools.count()
+
+
+class Grid:
+    """A compact maze grid - the walls of every cell are kept as a 4-bit mask.
+
+    Cells are addressed by a flat index (row * cols + col) and neighbours are
+    worked out from the index, so no per-cell objects are ever allocated.
+
+    Args:
+        rows (int):  The number of rows for the grid.
+        cols (int):  The number of columns for the grid.
+        walls:       Existing wall masks, e.g. of a loaded maze - a bytearray
+                     or PackedWalls. Every cell is walled off if None.
+
+    """
+
+    def __init__(self, rows, cols, walls=None):
+        self.rows = rows
+        self.cols = cols
+        self.size = rows * cols
+
+        # every cell is walled off initially
+        self.walls = walls if walls is not None else bytearray([ALL_WALLS]) * self.size
+        # cells that are part of the last found path - for printing
+        self.path = bytearray(self.size)
+        # cost of stepping into each cell, see terrain.py - None if every step costs 1
+        self.costs = None
+
+        # caches key on the id, the version is bumped on every wall change
+        # so cached results can tell they are stale
+        self.id = next(_grid_ids)
+        self.version = 0
+        # called with (i, j) after the wall between cells i and j changed,
+        # e.g. by an incremental planner
+        self.wall_listeners = []
+
+    def index(self, r, c):
+        """Convert (row, col) coordinates to a flat index"""
+        return r * self.cols + c
+
+    def coords(self, i):
+        """Convert a flat index to (row, col) coordinates"""
+        return divmod(i, self.cols)
+
+    def neighbour(self, i, direction):
+        """Retrieve the neighbour index in a direction or -1 at the maze edge"""
+        cols = self.cols
+        if direction == NORTH:
+            return i - cols if i >= cols else -1
+        elif direction == EAST:
+            return i + 1 if (i + 1) % cols else -1
+        elif direction == SOUTH:
+            return i + cols if i + cols < self.size else -1
+        elif direction == WEST:
+            return i - 1 if i % cols else -1
+        return -1
+
+    def direction(self, i, j):
+        """Retrieve the direction from cell i to the adjacent cell j, 0 if not adjacent"""
+        cols = self.cols
+        if j == i - cols:
+            return NORTH
+        elif j == i + cols:
+            return SOUTH
+        elif j == i + 1 and j % cols:
+            return EAST
+        elif j == i - 1 and i % cols:
+            return WEST
+        return 0
+
+    def has_wall(self, i, direction):
+        return bool(self.walls[i] & direction)
+
+    def get_neighbours(self, i):
+        """Retrieve a list of neighbours; regardless whether a wall exists"""
+        cols = self.cols
+        neighbours = []
+        if i >= cols:
+            neighbours.append(i - cols)
+        if (i + 1) % cols:
+            neighbours.append(i + 1)
+        if i + cols < self.size:
+            neighbours.append(i + cols)
+        if i % cols:
+            neighbours.append(i - 1)
+        return neighbours
+
+    def path_neighbours(self, i):
+        """Retrieve a list of neighbours which a path/link exists"""
+        cols = self.cols
+        w = self.walls[i]
+        neighbours = []
+        if not w & NORTH and i >= cols:
+            neighbours.append(i - cols)
+        if not w & EAST and (i + 1) % cols:
+            neighbours.append(i + 1)
+        if not w & SOUTH and i + cols < self.size:
+            neighbours.append(i + cols)
+        if not w & WEST and i % cols:
+            neighbours.append(i - 1)
+        return neighbours
+
+    def inner_sides(self, i):
+        """The sides of cell i that face another cell rather than the maze edge"""
+        cols = self.cols
+        sides = ALL_WALLS
+        if i < cols:
+            sides &= ~NORTH
+        if i + cols >= self.size:
+            sides &= ~SOUTH
+        c = i % cols
+        if c == 0:
+            sides &= ~WEST
+        if c == cols - 1:
+            sides &= ~EAST
+        return sides
+
+    def open_sides(self):
+        """The sides of every cell open towards another cell - a bytearray of masks.
+
+        Built with translations and slice assignments over the whole wall
+        array, so it runs at C speed. The outer openings of the start and exit
+        cells don't count.
+        """
+        cols = self.cols
+        walls = self.walls.tobytes() if isinstance(self.walls, PackedWalls) else bytes(self.walls)
+        sides = bytearray(walls.translate(_OPEN))
+        sides[:cols] = sides[:cols].translate(_CLEAR[NORTH])
+        sides[self.size - cols:] = sides[self.size - cols:].translate(_CLEAR[SOUTH])
+        sides[0::cols] = sides[0::cols].translate(_CLEAR[WEST])
+        sides[cols - 1::cols] = sides[cols - 1::cols].translate(_CLEAR[EAST])
+        return sides
+
+    def dead_ends(self):
+        """The indices of the cells with a single open side, in one linear scan"""
+        return array('i', itertools.compress(range(self.size), self.open_sides().translate(_SINGLE_SIDE)))
+
+    def wall_neighbours(self, i):
+        """Return a list of neighbours that have a wall between the current cell"""
+        cols = self.cols
+        w = self.walls[i]
+        neighbours = []
+        if w & NORTH and i >= cols:
+            neighbours.append(i - cols)
+        if w & EAST and (i + 1) % cols:
+            neighbours.append(i + 1)
+        if w & SOUTH and i + cols < self.size:
+            neighbours.append(i + cols)
+        if w & WEST and i % cols:
+            neighbours.append(i - 1)
+        return neighbours
+
+    def break_wall(self, i, j):
+        """Breaks the wall between two adjacent cells"""
+        d = self.direction(i, j)
+        if d:
+            self.walls[i] &= ~d
+            self.walls[j] &= ~OPPOSITE[d]
+            self.version += 1
+            for listener in self.wall_listeners:
+                listener(i, j)
+
+    def add_wall(self, i, j):
+        """Puts the wall back between two adjacent cells"""
+        d = self.direction(i, j)
+        if d:
+            self.walls[i] |= d
+            self.walls[j] |= OPPOSITE[d]
+            self.version += 1
+            for listener in self.wall_listeners:
+                listener(i, j)
+
+    def open_edge(self, i, direction):
+        """Remove an outer wall of a cell, i.e. for the start and exit cells"""
+        self.walls[i] &= ~direction
+        self.version += 1
+
+    def reset_path(self):
+        self.path = bytearray(self.size)
+
+
+def or_bytes(*rows):
+    """Bitwise OR of equally long byte strings, at C speed through one big integer per row"""
+    merged = 0
+    for row in rows:
+        merged |= int.from_bytes(row, 'little')
+    return merged.to_bytes(len(rows[0]), 'little')
+
+
+def unpack_walls(packed, size):
+    """Unpack two wall masks per byte into a bytearray of one mask per cell"""
+    packed = bytes(packed)
+    walls = bytearray(2 * len(packed))
+    walls[0::2] = packed.translate(_LOW_NIBBLE)
+    walls[1::2] = packed.translate(_HIGH_NIBBLE)
+    del walls[size:]
+    return walls
+
+
+class PackedWalls:
+    """Wall masks of two cells packed per byte - the even cell in the low nibble.
+
+    Reads straight from the underlying buffer, e.g. a memory-mapped maze file,
+    so nothing has to be unpacked up front.
+
+    Args:
+        buf (memoryview): The packed wall nibbles.
+        size (int):       The number of cells.
+
+    """
+
+    def __init__(self, buf, size):
+        self.buf = buf
+        self.size = size
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        b = self.buf[i >> 1]
+        return b >> 4 if i & 1 else b & 0xF
+
+    def tobytes(self):
+        """The wall masks unpacked to one per byte"""
+        return bytes(unpack_walls(self.buf, self.size))
+
+    def __setitem__(self, i, value):
+        b = self.buf[i >> 1]
+        if i & 1:
+            self.buf[i >> 1] = (b & 0x0F) | ((value & 0xF) << 4)
+        else:
+            self.buf[i >> 1] = (b & 0xF0) | (value & 0xF)
@@ -0,0 +1,155 @@
+import math
+import time
+import heapq as h
+import logging
+import weakref
+from array import array
+import searches
+
+INF = math.inf
+
+
+def _listen(grid, planner):
+    """Pass the wall changes of grid on to planner without keeping it alive"""
+    def listener(i, j):
+        alive = ref()
+        if alive is not None:
+            alive.wall_changed(i, j)
+
+    def forget(_):
+        if listener in grid.wall_listeners:
+            grid.wall_listeners.remove(listener)
+
+    ref = weakref.ref(planner, forget)
+    grid.wall_listeners.append(listener)
+    return listener
+
+
+class LPAStar:
+    """Lifelong Planning A* - keeps the shortest path up to date as walls change.
+
+    Every cell has g(n), its settled path cost from the start, and rhs(n), the
+    cost the best neighbour offers it. A cell whose two disagree is queued and
+    only those cells are expanded, so after a wall change the search repairs
+    the part of the search tree the change reached rather than starting over.
+
+    The planner listens to the wall changes of its grid (Grid.break_wall and
+    Grid.add_wall) and replan() brings the path up to date. A step costs the
+    terrain cost of the cell stepped into - changing the terrain itself needs
+    a new planner.
+
+    close() stops listening, or use the planner as a context manager. The grid
+    only holds a weak reference, so a planner that is dropped without closing
+    it stops listening once it is garbage collected.
+
+    Args:
+        grid (Grid):      The grid to plan on.
+        start_cell (int): The index of the start cell.
+        exit_cell (int):  The index of the exit cell.
+
+    """
+
+    def __init__(self, grid, start_cell, exit_cell):
+        self.grid = grid
+        self.start = start_cell
+        self.exit = exit_cell
+        self.g = array('d', [INF]) * grid.size
+        self.rhs = array('d', [INF]) * grid.size
+        self.rhs[start_cell] = 0
+        self.queue = [(self._key(start_cell), start_cell)]
+        # wall changes since the last replan
+        self.changes = 0
+        self._listener = _listen(grid, self)
+
+    def close(self):
+        """Stop listening to wall changes of the grid"""
+        if self._listener in self.grid.wall_listeners:
+            self.grid.wall_listeners.remove(self._listener)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _key(self, i):
+        m = min(self.g[i], self.rhs[i])
+        return m + searches.manhattan(self.grid, i, self.exit), m
+
+    def _step_cost(self, i):
+        costs = self.grid.costs
+        return costs[i] if costs is not None else 1
+
+    def _update(self, i):
+        """Recompute rhs(i) from the neighbours and queue i if it is inconsistent"""
+        g = self.g
+        if i != self.start:
+            best = min([g[n] for n in self.grid.path_neighbours(i)], default=INF)
+            self.rhs[i] = best + self._step_cost(i)
+        if g[i] != self.rhs[i]:
+            h.heappush(self.queue, (self._key(i), i))
+
+    def wall_changed(self, i, j):
+        """A wall between cells i and j was broken or added"""
+        self._update(i)
+        self._update(j)
+        self.changes += 1
+
+    def _compute(self):
+        """Expand inconsistent cells until the exit is settled - returns the number expanded"""
+        g = self.g
+        rhs = self.rhs
+        queue = self.queue
+        path_neighbours = self.grid.path_neighbours
+        exit_cell = self.exit
+        expanded = 0
+
+        while queue:
+            key, curr = queue[0]
+            # stale entry - the cell was settled or queued again with another key
+            if g[curr] == rhs[curr] or key != self._key(curr):
+                h.heappop(queue)
+                continue
+            if key >= self._key(exit_cell) and g[exit_cell] == rhs[exit_cell]:
+                break
+            h.heappop(queue)
+            expanded += 1
+
+            if g[curr] > rhs[curr]:
+                # a cheaper path was found - settle it
+                g[curr] = rhs[curr]
+            else:
+                # the path got more expensive - reopen the cell
+                g[curr] = INF
+                self._update(curr)
+            for n in path_neighbours(curr):
+                self._update(n)
+        return expanded
+
+    def path(self):
+        """The current shortest path from the start to the exit - empty if unreachable"""
+        g = self.g
+        cell = self.exit
+        if g[cell] == INF:
+            return []
+        path = [cell]
+        while cell != self.start and len(path) <= self.grid.size:
+            cell = min(self.grid.path_neighbours(cell), key=g.__getitem__)
+            path.append(cell)
+        path.reverse()
+        return path
+
+    def replan(self):
+        """Repair the path after the wall changes since the last call.
+
+        Returns a searches.SearchResult - expanded counts only the cells touched
+        by this update and time is its latency.
+        """
+        start_time = time.perf_counter()
+        changes = self.changes
+        self.changes = 0
+        expanded = self._compute()
+        path = self.path()
+        logging.info("LPA* update: {0} wall changes repaired in {1:.3f} ms".format(
+            changes, 1000 * (time.perf_counter() - start_time)))
+        return searches.path_result("LPA*", self.grid, path, expanded, start_time)
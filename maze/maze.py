@@ -1,119 +1,257 @@
 #!/usr/bin/env python
 
+import io
 import os
 import sys
 import yaml
 import random
+import itertools
 import searches
 import logging
 import argparse
 import collections
+import maze_file
+import maze_image
+import terrain
+import distance
+import corridor
+import analysis
+import incremental
+import steps
+import stream
+import metrics
+import row_generators
 from maze_config_parser import MazeConfig
-from cell import Cell
+from array import array
+from cell import Cell, CellList
+from grid import Grid, NORTH, EAST, SOUTH, WEST, DIRECTIONS, outer_edge
+
+
+# a random byte picks one of the four directions
+_RANDOM_DIRECTION = bytes(DIRECTIONS[b & 3] for b in range(256))
 
 
 class Maze:
     """This maze can be generated with a DFS or PRIMs algorithm.
 
+    The maze is backed by a Grid which keeps the walls of every cell as a
+    bitmask in a flat array. Cell objects are only created on demand as
+    lazy views, e.g. through cell_list, start_cell and exit_cell.
+
     Args:
         rows (int):           The number of rows for the maze.
         cols (int):           The number of columns for the maze.
         start_coords (tuple): The coordinates of the start cell.
         exit_coords (tuple):  The coordinates of the exit cell.
+        seed (int):           Seed for the maze's own random generator, or a
+                              random.Random instance to use as is. If None, a
+                              seed is drawn from the global random module.
+        walls:                Existing wall masks, e.g. of a loaded maze,
+                              instead of a fully walled off grid.
 
     """
 
-    def __init__(self, rows, cols, start_coords, exit_coords):
-        def add_neighbour(curr, cell, dir):
-            if dir == 'east':
-                curr.add_east(cell)
-                cell.add_west(curr)
-            elif dir == 'south':
-                curr.add_south(cell)
-                cell.add_north(curr)
-
-        # keep a 2D grid of the maze
-        self.cell_list = []
-        self.rows = rows
-        self.cols = cols
-
-        # rows loop
-        for r in range(self.rows):
-            row_list = []
-            # cols loop
-            for c in range(self.cols):
-                new_cell = Cell((r, c))
-                # NW corner
-                if c == 0 and r == 0:
-                    logging.debug('NW corner')
-                # NE corner
-                elif c == self.cols-1 and r == 0:
-                    logging.debug('NE corner')
-                    left_cell = row_list[c-1]
-                    add_neighbour(left_cell, new_cell, 'east')
-                # SW corner
-                elif c == 0 and r == self.rows-1:
-                    logging.debug('SW corner')
-                    top_cell = self.cell_list[r-1][c]
-                    add_neighbour(top_cell, new_cell, 'south')
-                elif r == 0:
-                    logging.debug("First row: {0}".format(c))
-                    left_cell = row_list[c-1]
-                    add_neighbour(left_cell, new_cell, 'east')
-                # middle rows - first col
-                elif r < self.rows-1 and c == 0:
-                    logging.debug("Col 0: {0}".format(r))
-                    top_cell = self.cell_list[r-1][c]
-                    add_neighbour(top_cell, new_cell, 'south')
-                # the rest of the rows
-                else:
-                    top_cell = self.cell_list[r-1][c]
-                    top_cell.add_south(new_cell)
-                    left_cell = row_list[c-1]
-                    left_cell.add_east(new_cell)
-                    new_cell.add_west(left_cell)
-                    new_cell.add_north(top_cell)
-                    if c == self.cols-1 and r == self.rows-1:
-                        logging.debug('SE corner')
-                    else:
-                        logging.debug("(Row,Col): ({0}, {1})".format(r, c))
-
-                row_list.append(new_cell)
-            self.cell_list.append(row_list)
-
-        # start and exit cells
-        self.start_cell = self.cell_list[start_coords[0]][start_coords[1]]
-        self.start_coords = start_coords
-        self.exit_cell = self.cell_list[exit_coords[0]][exit_coords[1]]
-        self.exit_coords = exit_coords
-
-        # break walls for start and exit cells
-        for coords, cell in zip([start_coords, exit_coords], [self.start_cell, self.exit_cell]):
-            # check columns
-            if coords[1] == 0:
-                cell.west_wall = False
-            elif coords[1] == self.cols-1:
-                cell.east_wall = False
-            # check rows
-            elif coords[0] == 0:
-                cell.north_wall = False
-            elif coords[0] == self.rows-1:
-                cell.south_wall = False
+    def __init__(self, rows, cols, start_coords, exit_coords, seed=None, walls=None):
+        with metrics.recorder.phase('init'):
+            self.rows = rows
+            self.cols = cols
+            self.grid = Grid(rows, cols, walls)
+
+            # every maze owns its random generator so generation is reproducible
+            # and independent of other mazes built in the same process
+            if isinstance(seed, random.Random):
+                self.seed = None
+                self.rng = seed
+            else:
+                self.seed = seed if seed is not None else random.getrandbits(32)
+                self.rng = random.Random(self.seed)
+
+            # junction graph for repeated searches - built on first use
+            self._corridors = None
+            # (grid version, analysis.MazeStats) of the last analyze()
+            self._analysis = None
+
+            # start and exit cells
+            self.start = self.grid.index(start_coords[0], start_coords[1])
+            self.start_coords = start_coords
+            self.exit = self.grid.index(exit_coords[0], exit_coords[1])
+            self.exit_coords = exit_coords
+
+            # break walls for start and exit cells
+            for coords, i in zip([start_coords, exit_coords], [self.start, self.exit]):
+                d = outer_edge(rows, cols, coords)
+                if d:
+                    self.grid.open_edge(i, d)
+
+    @classmethod
+    def from_record(cls, record):
+        """Create a maze from a decoded maze_file.MazeRecord"""
+        maze = cls(record.rows, record.cols, record.start_coords, record.exit_coords,
+                   seed=record.seed, walls=record.walls)
+        maze.seed = record.seed
+        return maze
+
+    @classmethod
+    def load(cls, path, index=0, use_mmap=True):
+        """Load a maze saved with save() or the index-th maze of a pack file.
+
+        With use_mmap the file is memory-mapped and the walls are read straight
+        from the packed nibbles, so huge mazes are ready without parsing.
+        Otherwise the walls are unpacked into memory for faster traversal.
+        """
+        reader = maze_file.MazeReader(path)
+        return cls.from_record(reader.record(index, unpack=not use_mmap))
+
+    def save(self, path):
+        """Save the maze in the binary maze format"""
+        maze_file.save(self, path)
+
+    @property
+    def cell_list(self):
+        """Lazy 2D grid of Cell views - cell_list[row][col]"""
+        return CellList(self.grid)
+
+    @property
+    def start_cell(self):
+        return Cell(self.grid, self.start)
+
+    @property
+    def exit_cell(self):
+        return Cell(self.grid, self.exit)
+
+    def solve(self, search_type):
+        """Search a path from the start to the exit cell - returns a searches.SearchResult.
+
+        Searches keep their state to themselves, so one maze can be solved by
+        any number of searches at the same time. The corridor search runs on
+        the cached corridor_graph instead of the grid.
+        """
+        with metrics.recorder.phase('search', search_type) as stats:
+            if stats is not None:
+                result = steps.run(metrics.watch(self.solve_steps(search_type), stats))
+            elif search_type == 'corridor':
+                result = self.corridor_graph.search(self.start, self.exit)
+            else:
+                result = searches.path_searches[search_type](self.grid, self.start, self.exit)
+        return result
+
+    def solve_steps(self, search_type):
+        """The search as step events - the SearchResult is the generator's return value.
+
+        Iterate it to animate the search, or stop it early with steps.run() and
+        a step budget or timeout, see steps.py. The corridor search runs on the
+        cached corridor_graph as in solve().
+        """
+        if search_type == 'corridor':
+            return self.corridor_graph.search_steps(self.start, self.exit)
+        return searches.search_steps[search_type](self.grid, self.start, self.exit)
+
+    @property
+    def corridor_graph(self):
+        """The maze compressed into junctions and corridors, see corridor.CorridorGraph.
+
+        Built on first use and kept up to date by break_wall, any other change
+        to the walls or the terrain rebuilds it on the next use.
+        """
+        if self._corridors is None or not self._corridors.is_current(self.grid):
+            self._corridors = corridor.CorridorGraph(self.grid, (self.start, self.exit))
+        return self._corridors
+
+    def distance_field(self, sources=None):
+        """Distances from a source cell, or several at once, to every cell.
+
+        Fields are cached per maze and source, so any number of paths can be
+        queried for the price of one flood - see distance.DistanceField.
+
+        Args:
+            sources: A cell index or Cell, an iterable of them, or None for
+                     the start cell.
+
+        """
+        if sources is None:
+            sources = self.start
+        elif isinstance(sources, Cell):
+            sources = sources.index
+        elif not isinstance(sources, int):
+            sources = [s.index if isinstance(s, Cell) else s for s in sources]
+        return distance.fields.get(self.grid, sources)
+
+    def path_to(self, target, sources=None):
+        """Shortest path to a cell index or Cell from the nearest of the sources"""
+        if isinstance(target, Cell):
+            target = target.index
+        return self.distance_field(sources).path_to(target)
+
+    def analyze(self):
+        """Dead end, corridor and junction counts, loops, diameter, solution length
+        and connectivity of the maze - returns an analysis.MazeStats.
+
+        Every pass is linear in the cells. The result is cached until the walls
+        change, e.g. by break_wall.
+        """
+        if self._analysis is None or self._analysis[0] != self.grid.version:
+            with metrics.recorder.phase('analyze'):
+                self._analysis = (self.grid.version, analysis.analyze(self.grid, self.start, self.exit))
+        return self._analysis[1]
+
+    def gen_terrain(self, terrain_type, low=1, high=9):
+        """Lay a terrain of step costs over the maze, see terrain.py.
+
+        Args:
+            terrain_type (str): uniform, noise or the path of a cost file.
+            low (int):          The lowest generated cost.
+            high (int):         The highest generated cost.
+
+        """
+        self.set_terrain(terrain.generate(terrain_type, self.rows, self.cols, self.rng, low, high))
+
+    def set_terrain(self, costs):
+        """Use the per-cell step costs for searching - None for flat terrain"""
+        if costs is not None:
+            terrain.validate(costs, self.grid.size)
+        self.grid.costs = costs
+
+    def mark_path(self, path):
+        """Mark the cells of a found path for printing"""
+        for i in path:
+            self.grid.path[i] = 1
 
     def reset_visited(self):
         """Reset the path cell for printing"""
-        for r in range(self.rows):
-            for c in range(self.cols):
-                self.cell_list[r][c].tmp_path = False
+        self.grid.reset_path()
 
     def print_graph(self):
         """Printing maze with just coordinates - early debugging"""
         for r in range(self.rows):
             for c in range(self.cols):
-                print(" {0} ".format(self.cell_list[r][c].coords), end='')
+                print(" {0} ".format((r, c)), end='')
             print('')
 
     def print_maze(self):
+        """Print the maze and the last found path to stdout"""
+        self.render(sys.stdout)
+
+    def to_string(self):
+        """Render the maze and the last found path into a string"""
+        stream = io.StringIO()
+        self.render(stream)
+        return stream.getvalue()
+
+    def render(self, stream=None):
+        """Render the maze to a file-like object, stdout by default.
+
+        Every text line is built with a single join and each row of cells is
+        written with one write call, rather than a print per wall segment.
+        """
+        if stream is None:
+            stream = sys.stdout
+        lines = self.render_lines()
+        # a row of cells is two text lines, the south edge is the last one
+        for first in lines:
+            second = next(lines, None)
+            stream.write(first + '\n' if second is None else first + '\n' + second + '\n')
+
+    def render_lines(self):
         """A Cell is represented in 'three' rows:
 
         +--+ First row
@@ -122,6 +260,8 @@ class Maze:
 
         When printing the maze however, we only print the first row and the middle.
         This is to negate 'overlapping' walls between cells.
+
+        Yields every text line of the maze without the newline.
         """
         corner = "+"
         h_wall = "--"
@@ -132,162 +272,517 @@ class Maze:
         long_filled = u"\u2588"
         # long_filled = "\u25ae"  # something wrong with my linux printing utf
 
-        square_filled = u"\u25a0"
-        square_filled = u"\u25a0"
-        square_two = square_filled + square_filled
-        square_one = square_filled
-
         long_one = long_filled
         long_two = long_one + long_one
         square_two = long_two
         square_one = long_one
 
-        def print_first_cell_row(cell):
-
-            # NW corner of cell
-            print(corner, end='')
-            if cell.north_wall:
-                print(h_wall, end='')
-            # link between north and current cell
-            elif cell.north_cell and cell.north_cell.tmp_path and cell.tmp_path:
-                print(long_two, end='')
-            elif cell == self.start_cell and self.start_coords[0] == 0:
-                print(square_two, end='')
-            elif cell == self.exit_cell and self.exit_coords[0] == 0:
-                print(square_two, end='')
-            else:
-                print(empty, end='')
-            # NE corner of a cell
-            if c == self.cols-1:
-                print(corner, end='')
-
-        def print_second_cell_row(cell):
-
-            if cell.west_wall:
-                print(v_wall, end='')
-            # start cell is special
-            elif cell == self.start_cell and self.start_coords[1] == 0:
-                print(long_one, end='')
-            elif cell == self.exit_cell and self.exit_coords[1] == 0:
-                print(long_one, end='')
-
-            # link between cells
-            elif cell.west_cell and cell.west_cell.tmp_path and cell.tmp_path:
-                print(square_one, end='')
-            else:
-                print(no_wall, end='')
-
-            # path cell
-            if cell.tmp_path:
-                print(square_two, end='')
-            else:
-                print(empty, end='')
-
-            # print east edge manually
-            if c == self.cols-1:
-                if cell.east_wall:
-                    print(v_wall, end='')
-                elif cell == self.exit_cell:
-                    print(long_one + ' Exit', end='')
-                elif cell == self.start_cell:
-                    print(long_one + ' Start', end='')
-                else:
-                    print(no_wall, end='')
+        walls = self.grid.walls
+        path = self.grid.path
+        cols = self.cols
+        start = self.start
+        exit = self.exit
+        start_north = self.start_coords[0] == 0
+        exit_north = self.exit_coords[0] == 0
+        start_west = self.start_coords[1] == 0
+        exit_west = self.exit_coords[1] == 0
 
         for r in range(self.rows):
-            # only print the first 'two' rows of a cell
-            for cell_row in range(1, 3):
-                for c in range(self.cols):
-                    cell = self.cell_list[r][c]
-                    # first 'row' of a cell
-                    if cell_row == 1:
-                        print_first_cell_row(cell)
-                    # middle row
-                    elif cell_row == 2:
-                        print_second_cell_row(cell)
-                print('')
-
-        # print the south edge manually
-        for c in range(self.cols):
-            cell = self.cell_list[self.rows-1][c]
-            print(corner, end='')
-            if cell.south_wall:
-                print(h_wall, end='')
-            elif cell == self.start_cell or cell == self.exit_cell:
-                print(square_two, end='')
+            offset = r*cols
+
+            # first 'row' of a cell - NW corner and north wall
+            first = []
+            for i in range(offset, offset + cols):
+                if walls[i] & NORTH:
+                    first.append(h_wall)
+                # link between north and current cell
+                elif i >= cols and path[i-cols] and path[i]:
+                    first.append(long_two)
+                elif i == start and start_north:
+                    first.append(square_two)
+                elif i == exit and exit_north:
+                    first.append(square_two)
+                else:
+                    first.append(empty)
+            # NE corner of the last cell
+            yield corner + corner.join(first) + corner
+
+            # middle row - west wall and the cell itself
+            second = []
+            for i in range(offset, offset + cols):
+                if walls[i] & WEST:
+                    second.append(v_wall)
+                # start cell is special
+                elif i == start and start_west:
+                    second.append(long_one)
+                elif i == exit and exit_west:
+                    second.append(long_one)
+                # link between cells
+                elif i > offset and path[i-1] and path[i]:
+                    second.append(square_one)
+                else:
+                    second.append(no_wall)
+
+                # path cell
+                second.append(square_two if path[i] else empty)
+
+            # east edge of the last cell
+            i = offset + cols - 1
+            if walls[i] & EAST:
+                second.append(v_wall)
+            elif i == exit:
+                second.append(long_one + ' Exit')
+            elif i == start:
+                second.append(long_one + ' Start')
+            else:
+                second.append(no_wall)
+            yield ''.join(second)
+
+        # the south edge
+        south = []
+        for i in range((self.rows-1)*cols, self.rows*cols):
+            if walls[i] & SOUTH:
+                south.append(h_wall)
+            elif i == start or i == exit:
+                south.append(square_two)
             else:
-                print(no_wall, end='')
-            if c == self.cols-1:
-                print(corner, end='')
-        print('')
+                south.append(no_wall)
+        yield corner + corner.join(south) + corner
+
+    def to_image(self, path, cell_px=4, fmt=None):
+        """Save the maze and the last found path as a PNG, PPM or PGM image"""
+        maze_image.save_image(self, path, cell_px, fmt)
 
     def break_wall(self, c_cell, n_cell):
-        """Breaks the wall between two cells"""
-        if c_cell.north_cell == n_cell:
-            c_cell.north_wall = False
-            n_cell.south_wall = False
-        elif c_cell.east_cell == n_cell:
-            c_cell.east_wall = False
-            n_cell.west_wall = False
-        elif c_cell.south_cell == n_cell:
-            c_cell.south_wall = False
-            n_cell.north_wall = False
-        elif c_cell.west_cell == n_cell:
-            c_cell.west_wall = False
-            n_cell.east_wall = False
+        """Breaks the wall between two cells - either Cell views or grid indices"""
+        if isinstance(c_cell, Cell):
+            c_cell = c_cell.index
+        if isinstance(n_cell, Cell):
+            n_cell = n_cell.index
+
+        graph = self._corridors
+        if graph is not None and graph.is_current(self.grid):
+            graph.break_wall(c_cell, n_cell)
+            self.grid.break_wall(c_cell, n_cell)
+            graph.mark_current()
+        else:
+            self.grid.break_wall(c_cell, n_cell)
+
+    def add_wall(self, c_cell, n_cell):
+        """Puts the wall back between two cells - either Cell views or grid indices"""
+        if isinstance(c_cell, Cell):
+            c_cell = c_cell.index
+        if isinstance(n_cell, Cell):
+            n_cell = n_cell.index
+        self.grid.add_wall(c_cell, n_cell)
+
+    def planner(self):
+        """An incremental planner from the start to the exit cell.
+
+        It follows every later break_wall/add_wall, and replan() repairs the
+        path touching only the cells the changes affect - see incremental.LPAStar.
+        Close it, or use it in a with statement, once it is no longer needed.
+        """
+        return incremental.LPAStar(self.grid, self.start, self.exit)
+
+    def generate(self, maze_type):
+        """Generate the maze with the algorithm selected by --maze-type"""
+        with metrics.recorder.phase('generate', maze_type) as stats:
+            steps.run(metrics.watch(self.generate_steps(maze_type), stats))
+
+    def generate_steps(self, maze_type):
+        """The generation as step events - a (steps.CARVED, cell, from cell) tuple
+        per carved cell, or a (steps.ROW, first cell, cells) tuple per row for the
+        generators carving a row at a time"""
+        if maze_type in row_generators.row_generators:
+            return self.gen_row_maze_steps(maze_type)
+        generators = {
+            'dfs': self.gen_dfs_maze_steps,
+            'prim': self.gen_mod_prim_maze_steps,
+            'kruskal': self.gen_kruskal_maze_steps,
+            'wilson': self.gen_wilson_maze_steps,
+        }
+        return generators[maze_type]()
+
+    def remove_deadends(self, break_type, level=6):
+        """Remove deadends with the traversal selected by --break-type"""
+        breakers = {
+            'bfs': self.remove_deadends_bfs,
+            'dfs': self.remove_deadends_dfs,
+        }
+        with metrics.recorder.phase('remove-deadends', break_type) as stats:
+            visited = breakers[break_type](level)
+            if stats is not None:
+                stats.cells += visited
+
+    def braid(self, ratio):
+        """Remove an exact share of the dead ends, picked with the maze's random generator.
+
+        The dead ends are found in one linear scan of the walls (Grid.dead_ends)
+        and taken in random order by a lazy Fisher-Yates shuffle of that array.
+        Each one still a dead end is opened towards a walled neighbour, another
+        dead end if that doesn't overshoot as it removes both at once. Stops
+        once round(ratio * dead ends) are gone, so unlike remove_deadends the
+        share of loops doesn't depend on a traversal order. Runs in O(cells)
+        without allocating anything per cell.
+
+        Args:
+            ratio (float): The share of the dead ends to remove, 0 to 1.
+
+        Returns the number of dead ends removed.
+        """
+        if not 0 <= ratio <= 1:
+            raise ValueError("Braid ratio must be between 0 and 1, got {0}".format(ratio))
+        with metrics.recorder.phase('braid') as stats:
+            removed = self._braid(ratio)
+            if stats is not None:
+                stats.cells += removed
+        return removed
+
+    def _braid(self, ratio):
+        grid = self.grid
+        walls = grid.walls
+        inner_sides = grid.inner_sides
+        neighbour = grid.neighbour
+        rng = self.rng
+
+        dead_ends = grid.dead_ends()
+        n = len(dead_ends)
+        target = round(ratio * n)
+        removed = 0
+        j = 0
+        while removed < target and j < n:
+            # swap a random one of the remaining dead ends into place j
+            k = rng.randrange(j, n)
+            i = dead_ends[k]
+            dead_ends[k] = dead_ends[j]
+            dead_ends[j] = i
+            j += 1
+
+            sides = inner_sides(i)
+            # an earlier wall broken into it, or nothing to open in a one cell wide maze
+            if sides & ~walls[i] not in DIRECTIONS or not sides & walls[i]:
+                continue
+
+            # scan the walled sides from a random one - a dead end neighbour is taken
+            # right away, otherwise the first neighbour joined to the maze but not a dead end
+            first = rng.getrandbits(2)
+            pick = -1
+            for s in range(4):
+                d = DIRECTIONS[(first + s) & 3]
+                if not sides & walls[i] & d:
+                    continue
+                cell = neighbour(i, d)
+                open_sides = inner_sides(cell) & ~walls[cell]
+                if open_sides in DIRECTIONS:
+                    if removed + 2 <= target:
+                        pick = cell
+                        removed += 1
+                        break
+                elif open_sides and pick < 0:
+                    pick = cell
+            if pick >= 0:
+                grid.break_wall(i, pick)
+                removed += 1
+        return removed
 
     def gen_dfs_maze(self):
-        """Generate maze based on the simple DFS algorithm with backtracking"""
-        print("\n{0}\nGenerate DFS maze\n{1}".format(100*"-", 100*"-"))
+        """Generate maze based on the simple DFS algorithm, see gen_dfs_maze_steps"""
+        steps.run(self.gen_dfs_maze_steps())
 
-        unvisited_stack = [self.start_cell]
-        visited_stack = []
+    def gen_dfs_maze_steps(self):
+        """Generate maze based on the simple DFS algorithm with backtracking.
+
+        Runs in linear time - every cell is pushed at most twice on the explicit
+        stack and visited cells are tracked in a bitmap.
+        """
+        grid = self.grid
+        unvisited_stack = [self.start]
+        # visited bitmap - O(1) membership instead of scanning a list
+        visited = bytearray(grid.size)
+        yield steps.FRONTIER, unvisited_stack, 0
 
         while unvisited_stack:
             curr = unvisited_stack.pop()
 
             # mark it as visited
-            visited_stack.append(curr)
-            neighbours = [n for n in curr.get_neighbours() if n not in visited_stack]
+            visited[curr] = 1
+            neighbours = [n for n in grid.get_neighbours(curr) if not visited[n]]
 
             # if the current cell has neighbours(s), we add it back to the stack
             # this allows backtracking in case the cell has multiple neighbours
             if neighbours:
-                cell = neighbours.pop(random.randint(0, len(neighbours)-1))
-                self.break_wall(curr, cell)
+                cell = neighbours.pop(self.rng.randint(0, len(neighbours)-1))
+                grid.break_wall(curr, cell)
                 unvisited_stack.append(curr)
                 unvisited_stack.append(cell)
+                yield steps.CARVED, cell, curr
+
+    def gen_kruskal_maze(self):
+        """Generate maze based on the randomized Kruskal's algorithm, see gen_kruskal_maze_steps"""
+        steps.run(self.gen_kruskal_maze_steps())
+
+    def gen_kruskal_maze_steps(self):
+        """Generate maze based on the randomized Kruskal's algorithm.
+
+        Every wall between two cells is an edge, coded as 2 * cell for the east
+        wall and 2 * cell + 1 for the south wall, kept in one flat array that
+        is shuffled once. Walls are broken in that order whenever they separate
+        two sets of cells, which gives many short dead ends without a bias
+        in any direction.
+
+        The sets are a disjoint-set forest in an int array of parents and a
+        bytearray of ranks - union by rank with path halving, so generation
+        runs in near-linear time without an object per cell.
+        """
+        grid = self.grid
+        size = grid.size
+        cols = self.cols
+
+        # every east and south wall, except those on the edge of the maze
+        inner = bytearray(b'\x01') * (2 * size)
+        inner[2 * (cols - 1)::2 * cols] = bytes(self.rows)
+        inner[2 * (size - cols) + 1::2] = bytes(cols)
+        edges = array('i', itertools.compress(range(2 * size), inner))
+        self.rng.shuffle(edges)
+
+        parent = array('i', range(size))
+        rank = bytearray(size)
+        joined = 0
+        for edge in edges:
+            a = edge >> 1
+            b = a + cols if edge & 1 else a + 1
+
+            # find the roots, halving the paths on the way
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            while parent[b] != b:
+                parent[b] = parent[parent[b]]
+                b = parent[b]
+            if a == b:
+                continue
+
+            # the lower ranked tree goes under the other
+            if rank[a] < rank[b]:
+                a, b = b, a
+            parent[b] = a
+            if rank[a] == rank[b]:
+                rank[a] += 1
+
+            cell = edge >> 1
+            other = cell + cols if edge & 1 else cell + 1
+            grid.break_wall(cell, other)
+            yield steps.CARVED, other, cell
+            joined += 1
+            if joined == size - 1:
+                break
+
+    def gen_wilson_maze(self, reference=False):
+        """Generate a uniformly random maze with Wilson's algorithm, see gen_wilson_maze_steps.
+
+        Args:
+            reference (bool): Use the Aldous-Broder random walk instead, it is
+                              far slower but kept for cross-checking as it
+                              picks from the same uniform distribution.
+
+        """
+        if reference:
+            steps.run(self.gen_aldous_broder_maze_steps())
+        else:
+            steps.run(self.gen_wilson_maze_steps())
+
+    def gen_wilson_maze_steps(self):
+        """Generate a uniformly random maze with Wilson's algorithm.
+
+        Every spanning tree of the grid is equally likely, so unlike DFS or
+        PRIM's there is no bias towards long corridors or short dead ends.
+        A random walk is taken from every cell not yet in the maze until it
+        hits the maze, then the loop-erased walk is carved in. The walk only
+        keeps the direction it last left each cell in, in a flat bytearray -
+        retracing those from the first cell erases any loop, so no list of
+        cells is ever built and the cost is dominated by drawing the random
+        directions, a chunk of random bytes at a time.
+
+        The maze grows from the middle cell - any cell gives the same uniform
+        distribution but the walks hit the middle soonest.
+        """
+        grid = self.grid
+        cols = self.cols
+        size = grid.size
+        rng = self.rng
+        in_maze = bytearray(size)
+        in_maze[grid.index(self.rows // 2, cols // 2)] = 1
+        # the direction the walk last left each cell in
+        walk = bytearray(size)
+        offset = {NORTH: -cols, EAST: 1, SOUTH: cols, WEST: -1}
+        directions = b''
+        k = 0
+
+        for cell in range(size):
+            if in_maze[cell]:
+                continue
+            curr = cell
+            while not in_maze[curr]:
+                if k == len(directions):
+                    directions = rng.randbytes(4096).translate(_RANDOM_DIRECTION)
+                    k = 0
+                d = directions[k]
+                k += 1
+                # moves off the maze are rejected, so every neighbour is equally likely
+                if d == NORTH:
+                    if curr < cols:
+                        continue
+                elif d == SOUTH:
+                    if curr + cols >= size:
+                        continue
+                elif d == EAST:
+                    if (curr + 1) % cols == 0:
+                        continue
+                elif curr % cols == 0:
+                    continue
+                walk[curr] = d
+                curr += offset[d]
+
+            # carve the loop-erased walk into the maze
+            curr = cell
+            while not in_maze[curr]:
+                n = curr + offset[walk[curr]]
+                grid.break_wall(curr, n)
+                in_maze[curr] = 1
+                yield steps.CARVED, curr, n
+                curr = n
+
+    def gen_aldous_broder_maze_steps(self):
+        """Generate a uniformly random maze with the Aldous-Broder random walk.
+
+        The walk wanders from the start cell and breaks the wall into every cell
+        it enters for the first time, until every cell is in the maze. It takes
+        a long time to reach the last few cells, only use it to cross-check
+        gen_wilson_maze_steps.
+        """
+        grid = self.grid
+        neighbour = grid.neighbour
+        rng = self.rng
+        in_maze = bytearray(grid.size)
+        in_maze[self.start] = 1
+        remaining = grid.size - 1
+
+        curr = self.start
+        while remaining:
+            n = neighbour(curr, DIRECTIONS[rng.getrandbits(2)])
+            if n < 0:
+                continue
+            if not in_maze[n]:
+                grid.break_wall(curr, n)
+                in_maze[n] = 1
+                remaining -= 1
+                yield steps.CARVED, n, curr
+            curr = n
+
+    def gen_row_maze(self, maze_type):
+        """Generate maze a row at a time - binary-tree, sidewinder or eller"""
+        steps.run(self.gen_row_maze_steps(maze_type))
+
+    def gen_row_maze_steps(self, maze_type):
+        """Generate maze a row at a time as step events, see row_generators.py.
+
+        Binary tree and sidewinder carve each row with a handful of bytes
+        operations, Eller's keeps only the sets of the current row.
+        """
+        cols = self.cols
+        carve_rows = row_generators.row_generators[maze_type](self.rows, cols, self.rng)
+        for r in row_generators.fill(self.grid, carve_rows):
+            yield steps.ROW, r * cols, cols
 
-    def gen_mod_prim_maze(self):
+    def gen_mod_prim_maze(self, reference=False):
         """Generate maze based on the modified PRIMs algorithm.
 
         Maze are cells that are 'visited' and part of the final maze.
         Frontier are cells that are yet to have walls broken.
+
+        The frontier is an unordered list - a random pick is swapped with the
+        last item and popped in O(1). Membership of the maze and the frontier
+        is tracked in bitmaps so generation runs in near-linear time.
+
+        Args:
+            reference (bool): Use the original list based algorithm instead,
+                              it is quadratic but kept for cross-checking.
+
         """
-        print("\n{0}\nGenerate modified PRIM maze\n{1}".format(100*"-", 100*"-"))
+        if reference:
+            return self.gen_mod_prim_maze_reference()
+        steps.run(self.gen_mod_prim_maze_steps())
+
+    def gen_mod_prim_maze_steps(self):
+        """The modified PRIMs algorithm as step events, see gen_mod_prim_maze"""
+        grid = self.grid
+        in_maze = bytearray(grid.size)
+        in_frontier = bytearray(grid.size)
+        in_maze[self.start] = 1
+
+        # add neighbours to the frontier
+        frontier = grid.get_neighbours(self.start)
+        for n in frontier:
+            in_frontier[n] = 1
+        yield steps.FRONTIER, frontier, 0
 
-        maze = [self.start_cell]
+        while frontier:
+            # pick one from the frontier at random - swap with the last and pop
+            k = self.rng.randint(0, len(frontier)-1)
+            f = frontier[k]
+            frontier[k] = frontier[-1]
+            frontier.pop()
+
+            # break the wall between a frontier cell and maze cell
+            # if multiple exist - pick one at random
+            neighbours = [n for n in grid.get_neighbours(f) if in_maze[n]]
+            if neighbours:
+                n = neighbours[self.rng.randint(0, len(neighbours)-1)]
+                grid.break_wall(n, f)
+                yield steps.CARVED, f, n
+
+            # mark the frontier cell to be a maze cell
+            in_maze[f] = 1
+
+            # add the neighbours of that cell to the frontier
+            for n in grid.get_neighbours(f):
+                if not in_frontier[n] and not in_maze[n]:
+                    in_frontier[n] = 1
+                    frontier.append(n)
+
+    def gen_mod_prim_maze_reference(self):
+        """Generate maze based on the original list based modified PRIMs algorithm.
+
+        Membership tests and random pops on the lists are O(n), only use it
+        to cross-check gen_mod_prim_maze on small mazes.
+
+        Maze are cells that are 'visited' and part of the final maze.
+        Frontier are cells that are yet to have walls broken.
+        """
+        grid = self.grid
+        maze = [self.start]
         frontier = []
 
         # add neighbours to the frontier
-        frontier += self.start_cell.get_neighbours()
+        frontier += grid.get_neighbours(self.start)
 
         while frontier:
             # pick on from the frontier at random
-            f = frontier.pop(random.randint(0, len(frontier)-1))
+            f = frontier.pop(self.rng.randint(0, len(frontier)-1))
 
             # break the wall between a frontier cell and maze cell
             # if multiple exist - pick one at random
-            neighbours = [n for n in f.get_neighbours() if n in maze]
-            random.shuffle(neighbours)
+            neighbours = [n for n in grid.get_neighbours(f) if n in maze]
+            self.rng.shuffle(neighbours)
             if neighbours:
-                self.break_wall(neighbours[0], f)
+                grid.break_wall(neighbours[0], f)
 
             # mark the frontier cell to be a maze cell
             maze.append(f)
 
             # add the neighbours of that cell to the frontier
-            for n in f.get_neighbours():
+            for n in grid.get_neighbours(f):
                 if n not in frontier and n not in maze:
                     frontier.append(n)
 
@@ -296,57 +791,87 @@ class Maze:
 
         This should be the same as BFS now that once I find the exit node - don't break
         Level is used to set the aggression level of removing deadends
+
+        Returns the number of cells visited.
         """
-        unvisited_fifo = collections.deque([self.start_cell])
+        grid = self.grid
+        unvisited_fifo = collections.deque([self.start])
         visited_fifo = set()
         broken = 1  # number of skipped deadends
 
         while len(unvisited_fifo):
             curr = unvisited_fifo.popleft()
-            if curr == self.exit_cell:
+            # a cell can be queued by several neighbours - only process it once,
+            # otherwise the duplicates multiply around every loop in the maze
+            if curr in visited_fifo:
+                continue
+            if curr == self.exit:
                 logging.debug("Removing deadends BFS: Exit found")
 
             # check if there are > 2 walls for a cell
-            wall_list = curr.wall_neighbours()
+            wall_list = grid.wall_neighbours(curr)
             if len(wall_list) > 2:
                 if broken % level == 0:
-                    self.break_wall(curr, wall_list[0])
+                    grid.break_wall(curr, wall_list[0])
                     broken = 1
                 else:
                     broken += 1
             # mark cell as visited and add neighbours to the fifo
             visited_fifo.add(curr)
-            unvisited_fifo += [n for n in curr.path_neighbours() if n not in visited_fifo]
+            unvisited_fifo += [n for n in grid.path_neighbours(curr) if n not in visited_fifo]
+        return len(visited_fifo)
 
     def remove_deadends_dfs(self, level=6):
         """Remove deadends (cells that have 3 walls) via a DFS path search.
 
         This should be the same as BFS now that once I find the exit node - don't break
         Level is used to set the aggression level of removing deadends
+
+        Returns the number of cells visited.
         """
-        unvisited_stack = [self.start_cell]
+        grid = self.grid
+        unvisited_stack = [self.start]
         visited_stack = set()
         broken = 1  # number of skipped deadends
 
         while unvisited_stack:
             curr = unvisited_stack.pop()
-            if curr == self.exit_cell:
+            if curr == self.exit:
                 logging.debug("Removing deadends DFS: Exit found")
 
             if curr not in visited_stack:
-                wall_list = curr.wall_neighbours()
+                wall_list = grid.wall_neighbours(curr)
                 if len(wall_list) > 2:
                     if broken % level == 0:
-                        self.break_wall(curr, wall_list[0])
+                        grid.break_wall(curr, wall_list[0])
                         broken = 1
                     else:
                         broken += 1
                 # mark cell as visited and add neighbours to stack
                 visited_stack.add(curr)
-                unvisited_stack += [n for n in curr.path_neighbours() if n not in visited_stack]
+                unvisited_stack += [n for n in grid.path_neighbours(curr) if n not in visited_stack]
+        return len(visited_stack)
+
+
+def stream_maze(config, start_cell, exit_cell):
+    """Generate the maze of the config row by row straight to --stream, see stream.py"""
+    rows, cols = config.maze_dimension
+    if config.maze_type not in row_generators.row_generators:
+        sys.exit("Streaming needs a maze type carving a row at a time: {0}".format(
+            ', '.join(row_generators.row_generators)))
+    path = None if config.maze_stream == '-' else config.maze_stream
+    with metrics.recorder.phase('generate', config.maze_type) as stats:
+        stream.generate(config.maze_type, rows, cols, start_cell, exit_cell, config.maze_seed, path)
+        if stats is not None:
+            stats.cells += rows * cols
 
 
 def main():
+    # batch mode has its own entry point - python maze batch --count N ...
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        import batch
+        return batch.main(sys.argv[2:])
+
     config = MazeConfig()
 
     # if config.yaml exists - use it
@@ -373,32 +898,43 @@ def main():
     if start_cell == exit_cell:
         start_cell, exit_cell = config.reset_to_defaults(start_cell, exit_cell)
 
+    if config.maze_metrics:
+        metrics.recorder.enable(config.maze_trace_allocations)
+
+    if config.maze_stream:
+        stream_maze(config, start_cell, exit_cell)
+        if config.maze_metrics:
+            metrics.recorder.save(config.maze_metrics)
+        return
 
     # generate specified maze
-    maze = Maze(rows, cols, start_cell, exit_cell)
-    maze.gen_mod_prim_maze() if config.maze_type == "prim" else maze.gen_dfs_maze()
+    maze = Maze(rows, cols, start_cell, exit_cell, seed=config.maze_seed)
+    logging.info("Maze seed: {0}".format(maze.seed))
+    print("\n{0}\nGenerate {1} maze\n{2}".format(100*"-", config.maze_type.upper(), 100*"-"))
+    maze.generate(config.maze_type)
+
+    # create an imperfect path by removing deadends - can tune with level or braid
+    if config.maze_braid is not None:
+        maze.braid(config.maze_braid)
+    else:
+        maze.remove_deadends(config.maze_break_type)
 
-    # create an imperfect path by removing deadends - can tune with level
-    maze.remove_deadends_bfs() if config.maze_break_type == "bfs" else maze.remove_deadends_dfs()
+    if config.maze_terrain:
+        maze.gen_terrain(config.maze_terrain, *config.maze_terrain_range)
 
-    # create a dictionary for the path searches
-    path_searches = {
-        'dfs': searches.dfs,
-        'bfs': searches.bfs,
-        'ucs': searches.ucs,
-        'a*': searches.astar,
-        'gs': searches.gs
-    }
+    if config.maze_analyze:
+        for field, value in maze.analyze()._asdict().items():
+            print("{0:>16}: {1}".format(field.replace('_', ' '), value))
 
     for s in config.maze_search_type:
-        path_searches[s](maze.start_cell,
-                         maze.exit_cell,
-                         maze.cell_list,
-                         maze.rows,
-                         maze.cols)
+        result = maze.solve(s)
+        maze.mark_path(result.path)
         maze.print_maze()
         maze.reset_visited()
 
+    if config.maze_metrics:
+        metrics.recorder.save(config.maze_metrics)
+
 
 if __name__ == "__main__":
     main()
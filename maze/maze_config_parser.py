@@ -1,3 +1,4 @@
+import os
 import math
 import yaml
 import logging
@@ -9,6 +10,12 @@ description = """
               There are many options that you can configure, read carefully.
               """
 
+batch_description = """
+                    Generate many mazes across a pool of worker processes.
+                    Maze i is generated with seed seed-base + i and every finished
+                    maze is streamed to the output file as it finishes.
+                    """
+
 class MazeConfig:
     def __init__(self):
         # default settings
@@ -18,7 +25,22 @@ class MazeConfig:
         self.maze_type = 'prim'
         self.maze_search_type = ['a*', 'dfs']
         self.maze_break_type = 'bfs'
+        self.maze_braid = None
         self.maze_logging = 'info'
+        self.maze_seed = None
+        self.maze_terrain = None
+        self.maze_terrain_range = [1, 9]
+        self.maze_stream = None
+        self.maze_analyze = False
+        self.maze_metrics = None
+        self.maze_trace_allocations = False
+
+        # batch mode settings
+        self.batch_count = 1000
+        self.batch_workers = os.cpu_count() or 1
+        self.batch_seed_base = 0
+        self.batch_output = 'mazes.jsonl'
+        self.batch_format = 'jsonl'
 
 
     def logging_level_to_enum(self, user_setting):
@@ -53,10 +75,14 @@ class MazeConfig:
         self.maze_logging = self.logging_level_to_enum(user_setting)
 
 
-    def process_cmd_args(self):
-        """Process command line arguments if YAML configuration file doesn't exist"""
+    def process_cmd_args(self, argv=None, batch=False):
+        """Process command line arguments if YAML configuration file doesn't exist
+
+        Batch mode adds the options for generating many mazes at once.
+        """
 
-        parser = argparse.ArgumentParser(description=description)
+        parser = argparse.ArgumentParser(prog='maze batch' if batch else None,
+                                         description=batch_description if batch else description)
         parser.add_argument("-d", "--dimension",
                             nargs=2,
                             type=int,
@@ -73,23 +99,92 @@ class MazeConfig:
                             default=self.maze_exit_cell,
                             help="Exit cell - must be less than maze dimension, the format is [ROW COL]")
         parser.add_argument("-m", "--maze-type",
-                            choices=['prim', 'dfs'],
+                            choices=['prim', 'dfs', 'kruskal', 'wilson', 'binary-tree', 'sidewinder', 'eller'],
                             default=self.maze_type,
-                            help="Maze generation algorithms: depth-first, PRIM's")
+                            help="Maze generation algorithms: depth-first, PRIM's, Kruskal's, Wilson's for "
+                                 "uniformly random mazes, and binary tree, sidewinder and Eller's which carve "
+                                 "a row at a time")
         parser.add_argument("-s", "--search-type",
                             nargs='*',
-                            choices=['dfs', 'bfs', 'ucs', 'a*', 'gs'],
+                            choices=['dfs', 'bfs', 'ucs', 'a*', 'gs', 'bfs-bi', 'a*-bi', 'jps', 'corridor'],
                             default=self.maze_search_type,
-                            help="Path search algorithms: depth-first, breadth-first, uniform-cost, A*")
+                            help="Path search algorithms: depth-first, breadth-first, uniform-cost, A*, greedy, "
+                                 "bidirectional breadth-first, bidirectional A*, jump point search, "
+                                 "A* over the junctions of the corridor graph")
         parser.add_argument("-b", "--break-type",
                             choices=['bfs', 'dfs'],
                             default=self.maze_break_type,
                             help="Breaking deadends for imperfect maze: breadth-first, depth-first")
+        parser.add_argument("--braid",
+                            type=float,
+                            default=self.maze_braid,
+                            help="Remove this share of the deadends at random instead of --break-type, "
+                                 "e.g. 0.35 - 0 keeps the maze perfect, 1 removes every deadend")
+        # a batch is seeded by --seed-base - --seed is only there to be rejected,
+        # argparse would otherwise take it for an abbreviation of --seed-base
+        parser.add_argument("--seed",
+                            type=int,
+                            default=None if batch else self.maze_seed,
+                            help=argparse.SUPPRESS if batch else
+                            "Seed for the maze generator - the same seed always generates the same maze")
+        parser.add_argument("-t", "--terrain",
+                            default=self.maze_terrain,
+                            help="Terrain of per-cell step costs for ucs, a* and gs: uniform, noise "
+                                 "or the path of a cost file (raw bytes, or numbers in a .txt/.csv)")
+        parser.add_argument("--terrain-range",
+                            nargs=2,
+                            type=int,
+                            default=self.maze_terrain_range,
+                            help="Lowest and highest generated terrain cost, between 1 and 255")
+        parser.add_argument("--analyze",
+                            action='store_true',
+                            default=self.maze_analyze,
+                            help="Report the deadends, corridors, junctions, loops, diameter, solution length "
+                                 "and connectivity of the maze")
+        parser.add_argument("--metrics",
+                            default=self.maze_metrics,
+                            help="Record the time, cells, queue operations and peak frontier of every "
+                                 "phase into this file - Prometheus text for .prom files, JSON otherwise")
+        parser.add_argument("--trace-allocations",
+                            action='store_true',
+                            default=self.maze_trace_allocations,
+                            help="Also record the peak memory allocated by every phase - slows everything down")
         parser.add_argument("-l", "--log-level",
                             choices=['warning', 'info', 'debug'],
                             default=self.logging_level_to_str(self.maze_logging),
                             help="Logging level - warning, info, debug")
-        args = parser.parse_args()
+        if not batch:
+            parser.add_argument("--stream",
+                                nargs='?',
+                                const='-',
+                                default=self.maze_stream,
+                                metavar='FILE',
+                                help="Generate a binary-tree, sidewinder or eller maze row by row straight to "
+                                     "FILE in the binary maze format, or as text to stdout without FILE - "
+                                     "memory stays proportional to the number of columns")
+        if batch:
+            parser.add_argument("-n", "--count",
+                                type=int,
+                                default=self.batch_count,
+                                help="Number of mazes to generate")
+            parser.add_argument("-w", "--workers",
+                                type=int,
+                                default=self.batch_workers,
+                                help="Number of worker processes - defaults to the number of cores")
+            parser.add_argument("--seed-base",
+                                type=int,
+                                default=self.batch_seed_base,
+                                help="Seed of the first maze, maze i is generated with seed-base + i")
+            parser.add_argument("-o", "--output",
+                                default=self.batch_output,
+                                help="File the mazes are streamed to as they finish")
+            parser.add_argument("-f", "--format",
+                                choices=['jsonl', 'pack'],
+                                default=self.batch_format,
+                                help="Output format: JSON lines with search results, binary maze pack")
+        args = parser.parse_args(argv)
+        if batch and args.seed is not None:
+            parser.error("--seed seeds a single maze, use --seed-base for a batch")
 
         # set logging level
         self.set_logging_level(args.log_level)
@@ -106,6 +201,21 @@ class MazeConfig:
         self.maze_type = args.maze_type
         self.maze_search_type = args.search_type
         self.maze_break_type = args.break_type
+        self.maze_braid = args.braid
+        self.maze_terrain = args.terrain
+        self.maze_terrain_range = args.terrain_range
+        self.maze_analyze = args.analyze
+        self.maze_metrics = args.metrics
+        self.maze_trace_allocations = args.trace_allocations
+        if not batch:
+            self.maze_seed = args.seed
+            self.maze_stream = args.stream
+        if batch:
+            self.batch_count = args.count
+            self.batch_workers = args.workers
+            self.batch_seed_base = args.seed_base
+            self.batch_output = args.output
+            self.batch_format = args.format
 
 
     def process_yaml_file(self, filepath):
@@ -131,6 +241,16 @@ class MazeConfig:
                 self.maze_search_type = yaml_file['search_type']
             if 'break_type' in yaml_file:
                 self.maze_break_type = yaml_file['break_type'][0]
+            if 'braid' in yaml_file:
+                self.maze_braid = yaml_file['braid'][0]
+            if 'seed' in yaml_file:
+                self.maze_seed = yaml_file['seed'][0]
+            if 'terrain' in yaml_file:
+                self.maze_terrain = yaml_file['terrain'][0]
+            if 'terrain_range' in yaml_file:
+                self.maze_terrain_range = yaml_file['terrain_range']
+            if 'metrics' in yaml_file:
+                self.maze_metrics = yaml_file['metrics'][0]
             if 'log_level' in yaml_file:
                 self.maze_logging = yaml_file['log_level'][0]
 
@@ -0,0 +1,243 @@
+"""Versioned binary maze format.
+
+A single maze record is a fixed size header followed by the wall masks of
+every cell packed two per byte (the even cell in the low nibble):
+
+    magic 'MAZE' | version | flags | rows | cols | start r, c | exit r, c | seed
+    ceil(rows * cols / 2) bytes of wall nibbles
+
+A pack file holds many maze records back to back for batch jobs:
+
+    magic 'MZPK' | version | reserved
+    maze record 0 | maze record 1 | ...
+    offset index (uint64 per record) | index offset | count | magic 'MZIX'
+
+The index is only written when the pack is closed, if it is missing the
+records are found by walking the headers instead.
+"""
+
+import os
+import mmap
+import struct
+import collections
+from array import array
+from grid import PackedWalls, or_bytes, unpack_walls
+
+VERSION = 1
+
+RECORD_MAGIC = b'MAZE'
+RECORD_HEADER = struct.Struct('<4sHHIIIIIIQ')
+FLAG_SEED = 1
+
+PACK_MAGIC = b'MZPK'
+PACK_HEADER = struct.Struct('<4sHH')
+INDEX_MAGIC = b'MZIX'
+INDEX_TRAILER = struct.Struct('<QQ4s')
+
+# translation table for packing nibbles at C speed - grid.unpack_walls undoes it
+_TO_HIGH_NIBBLE = bytes((b & 0xF) << 4 for b in range(256))
+
+MazeRecord = collections.namedtuple('MazeRecord',
+                                    ['rows', 'cols', 'start_coords', 'exit_coords', 'seed', 'walls', 'end'])
+
+
+class MazeFileError(ValueError):
+    pass
+
+
+def pack_walls(walls):
+    """Pack one wall mask per byte into two masks per byte"""
+    if isinstance(walls, PackedWalls):
+        return bytes(walls.buf)
+    walls = bytes(walls)
+    if len(walls) % 2:
+        walls += b'\0'
+    low = walls[0::2]
+    high = walls[1::2].translate(_TO_HIGH_NIBBLE)
+    # the nibbles never overlap so an OR merges them
+    return or_bytes(low, high)
+
+
+def record_header(rows, cols, start_coords, exit_coords, seed):
+    """The header of a maze record - the packed walls follow it"""
+    flags = 0
+    if seed is not None and 0 <= seed < 2**64:
+        flags |= FLAG_SEED
+    else:
+        seed = 0
+    return RECORD_HEADER.pack(RECORD_MAGIC, VERSION, flags, rows, cols,
+                              start_coords[0], start_coords[1],
+                              exit_coords[0], exit_coords[1],
+                              seed)
+
+
+def dumps(maze):
+    """Serialize a maze into a single binary record"""
+    header = record_header(maze.rows, maze.cols, maze.start_coords, maze.exit_coords, maze.seed)
+    return header + pack_walls(maze.grid.walls)
+
+
+def write_rows(f, rows, cols, start_coords, exit_coords, seed, wall_rows):
+    """Write a maze record from its wall masks one row at a time.
+
+    Only a row is held at once, so mazes bigger than memory can be written as
+    they are generated. With an odd number of columns a row ends halfway
+    through a byte, its last nibble is carried over to the next row.
+
+    Args:
+        f (file):          A binary file opened for writing.
+        wall_rows (iter):  The wall masks of every row, top to bottom.
+
+    """
+    f.write(record_header(rows, cols, start_coords, exit_coords, seed))
+    carry = b''
+    written = 0
+    for walls in wall_rows:
+        walls = carry + bytes(walls)
+        even = len(walls) & ~1
+        f.write(pack_walls(walls[:even]))
+        carry = walls[even:]
+        written += 1
+    if carry:
+        f.write(pack_walls(carry))
+    if written != rows:
+        raise MazeFileError("Expected {0} rows of walls, got {1}".format(rows, written))
+
+
+def decode(buf, offset=0, unpack=False):
+    """Decode the maze record starting at offset of a bytes-like buffer.
+
+    Args:
+        buf (bytes-like): The buffer holding the record, e.g. a memory map.
+        offset (int):     The offset of the record in the buffer.
+        unpack (bool):    Unpack the walls into a bytearray instead of a lazy
+                          PackedWalls view onto the buffer.
+
+    """
+    if len(buf) < offset + RECORD_HEADER.size:
+        raise MazeFileError("Truncated maze header at offset {0}".format(offset))
+    magic, version, flags, rows, cols, sr, sc, er, ec, seed = RECORD_HEADER.unpack_from(buf, offset)
+    if magic != RECORD_MAGIC:
+        raise MazeFileError("Not a maze record at offset {0}".format(offset))
+    if version > VERSION:
+        raise MazeFileError("Unsupported maze format version {0}".format(version))
+
+    size = rows * cols
+    start = offset + RECORD_HEADER.size
+    end = start + (size + 1) // 2
+    if len(buf) < end:
+        raise MazeFileError("Truncated maze walls at offset {0}".format(offset))
+
+    packed = memoryview(buf)[start:end]
+    walls = unpack_walls(packed, size) if unpack else PackedWalls(packed, size)
+    return MazeRecord(rows, cols, [sr, sc], [er, ec],
+                      seed if flags & FLAG_SEED else None,
+                      walls, end)
+
+
+def save(maze, path):
+    with open(path, 'wb') as f:
+        f.write(dumps(maze))
+
+
+def map_file(path):
+    """Memory-map a file copy-on-write - changes to a loaded maze never reach the file"""
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+
+class MazeReader:
+    """Random access to the mazes of a pack file (or a single maze file).
+
+    The file is memory-mapped and records are only decoded when accessed.
+
+    Args:
+        path (str): The path of the file.
+
+    """
+
+    def __init__(self, path):
+        self.buf = map_file(path)
+        self.offsets = self._read_offsets()
+
+    def _read_offsets(self):
+        buf = self.buf
+        if buf[:4] == RECORD_MAGIC:
+            return array('Q', [0])
+        if buf[:4] != PACK_MAGIC:
+            raise MazeFileError("Not a maze file")
+
+        # use the index if the pack was closed properly
+        if len(buf) >= PACK_HEADER.size + INDEX_TRAILER.size:
+            index_offset, count, magic = INDEX_TRAILER.unpack_from(buf, len(buf) - INDEX_TRAILER.size)
+            if magic == INDEX_MAGIC:
+                offsets = array('Q')
+                offsets.frombytes(buf[index_offset:index_offset + 8 * count])
+                return offsets
+
+        # otherwise walk the record headers
+        offsets = array('Q')
+        offset = PACK_HEADER.size
+        while offset + RECORD_HEADER.size <= len(buf) and buf[offset:offset + 4] == RECORD_MAGIC:
+            offsets.append(offset)
+            offset = decode(buf, offset).end
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, k):
+        return self.record(k)
+
+    def record(self, k, unpack=False):
+        return decode(self.buf, self.offsets[k], unpack)
+
+
+class MazeWriter:
+    """Streams many mazes into one pack file and writes the offset index on close.
+
+    Args:
+        path (str):     The path of the pack file.
+        append (bool):  Append to an existing pack instead of truncating it.
+
+    """
+
+    def __init__(self, path, append=False):
+        self.offsets = array('Q')
+        if append and os.path.exists(path) and os.path.getsize(path):
+            reader = MazeReader(path)
+            self.offsets = reader.offsets
+            end = decode(reader.buf, self.offsets[-1]).end if len(self.offsets) else PACK_HEADER.size
+            reader.buf.close()
+            self.f = open(path, 'r+b')
+            # drop the old index, it is rewritten on close
+            self.f.truncate(end)
+            self.f.seek(end)
+        else:
+            self.f = open(path, 'wb')
+            self.f.write(PACK_HEADER.pack(PACK_MAGIC, VERSION, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def write(self, maze):
+        self.write_record(dumps(maze))
+
+    def write_record(self, record):
+        """Append an already serialized maze record, e.g. from a worker process"""
+        self.offsets.append(self.f.tell())
+        self.f.write(record)
+
+    def close(self):
+        if self.f.closed:
+            return
+        index_offset = self.f.tell()
+        self.f.write(self.offsets.tobytes())
+        self.f.write(INDEX_TRAILER.pack(index_offset, len(self.offsets), INDEX_MAGIC))
+        self.f.close()
@@ -0,0 +1,178 @@
+import zlib
+import struct
+from grid import NORTH, EAST, SOUTH, WEST, PackedWalls, or_bytes, unpack_walls
+
+# palette indices of the raster
+WALL = 0
+BACKGROUND = 1
+PATH = 2
+
+PALETTE = [(0, 0, 0), (255, 255, 255), (220, 20, 60)]
+GRAY = [0, 255, 128]
+
+# a cell code packs its walls with whether the cell, its west neighbour and
+# its north neighbour are on the path - tables then map codes to pixels
+IN_PATH = 16
+WEST_IN_PATH = 32
+NORTH_IN_PATH = 64
+
+_TO_IN_PATH = bytes(IN_PATH if b else 0 for b in range(256))
+_TO_WEST_IN_PATH = bytes(WEST_IN_PATH if b else 0 for b in range(256))
+_TO_NORTH_IN_PATH = bytes(NORTH_IN_PATH if b else 0 for b in range(256))
+
+
+def _table(pixel):
+    return bytes(pixel(code) for code in range(256))
+
+
+# NW corner and north wall of a cell
+TOP_CORNER = _table(lambda code: WALL)
+TOP = _table(lambda code: WALL if code & NORTH else
+             PATH if code & IN_PATH and code & NORTH_IN_PATH else BACKGROUND)
+# west wall and inside of a cell
+MIDDLE_WEST = _table(lambda code: WALL if code & WEST else
+                     PATH if code & IN_PATH and code & WEST_IN_PATH else BACKGROUND)
+MIDDLE = _table(lambda code: PATH if code & IN_PATH else BACKGROUND)
+# south edge of the maze
+BOTTOM = _table(lambda code: WALL if code & SOUTH else
+                PATH if code & IN_PATH else BACKGROUND)
+
+
+def raster_rows(maze, cell_px=4):
+    """Yield the maze as rows of palette indices, one bytearray per pixel row.
+
+    A cell is cell_px pixels wide including its 1 pixel west and north walls,
+    the image is cols * cell_px + 1 pixels wide. Every pixel row is built with
+    bytes.translate and strided slice assignments - one per pixel column of a
+    cell - so the Python work is per row rather than per pixel.
+    """
+    if cell_px < 2:
+        raise ValueError("cell_px must be at least 2")
+
+    walls = maze.grid.walls
+    if isinstance(walls, PackedWalls):
+        walls = unpack_walls(walls.buf, walls.size)
+    path = maze.grid.path
+    rows, cols = maze.rows, maze.cols
+    width = cols * cell_px + 1
+    span = cols * cell_px
+
+    codes = b''
+    for r in range(rows):
+        offset = r * cols
+        w = bytes(walls[offset:offset + cols])
+        p = bytes(path[offset:offset + cols])
+        # the outer cells pair with themselves so open start/exit edges show the path
+        p_west = p[:1] + p[:-1]
+        p_north = bytes(path[offset - cols:offset]) if r else p
+        # the wall and path bits of a code never overlap
+        codes = or_bytes(w,
+                         p.translate(_TO_IN_PATH),
+                         p_west.translate(_TO_WEST_IN_PATH),
+                         p_north.translate(_TO_NORTH_IN_PATH))
+
+        top = bytearray(width)
+        top[0:span:cell_px] = codes.translate(TOP_CORNER)
+        top_fill = codes.translate(TOP)
+        for k in range(1, cell_px):
+            top[k:span:cell_px] = top_fill
+        top[-1] = WALL
+        yield top
+
+        middle = bytearray(width)
+        middle[0:span:cell_px] = codes.translate(MIDDLE_WEST)
+        middle_fill = codes.translate(MIDDLE)
+        for k in range(1, cell_px):
+            middle[k:span:cell_px] = middle_fill
+        last = codes[-1]
+        middle[-1] = WALL if last & EAST else PATH if last & IN_PATH else BACKGROUND
+        for k in range(1, cell_px):
+            yield middle
+
+    bottom = bytearray(width)
+    bottom[0:span:cell_px] = codes.translate(TOP_CORNER)
+    bottom_fill = codes.translate(BOTTOM)
+    for k in range(1, cell_px):
+        bottom[k:span:cell_px] = bottom_fill
+    bottom[-1] = WALL
+    yield bottom
+
+
+def _png_chunk(kind, data):
+    chunk = kind + data
+    return struct.pack('>I', len(data)) + chunk + struct.pack('>I', zlib.crc32(chunk) & 0xFFFFFFFF)
+
+
+def write_png(f, width, height, rows):
+    """Write palette rows as an 8-bit indexed colour PNG"""
+    f.write(b'\x89PNG\r\n\x1a\n')
+    f.write(_png_chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0)))
+    f.write(_png_chunk(b'PLTE', b''.join(bytes(c) for c in PALETTE)))
+
+    compressor = zlib.compressobj(6)
+    pending = []
+    pending_size = 0
+    previous = None
+    unchanged = b'\x02' + bytes(width)
+    for row in rows:
+        # a row repeating the one above is all zeros with the 'up' filter,
+        # everything else is stored unfiltered
+        data = compressor.compress(unchanged if row == previous else b'\x00' + row)
+        previous = row
+        if data:
+            pending.append(data)
+            pending_size += len(data)
+        if pending_size > 1 << 20:
+            f.write(_png_chunk(b'IDAT', b''.join(pending)))
+            pending = []
+            pending_size = 0
+    pending.append(compressor.flush())
+    f.write(_png_chunk(b'IDAT', b''.join(pending)))
+    f.write(_png_chunk(b'IEND', b''))
+
+
+def write_ppm(f, width, height, rows):
+    """Write palette rows as a binary (P6) colour PPM"""
+    red, green, blue = (bytes(c[k] for c in PALETTE) + bytes(256 - len(PALETTE)) for k in range(3))
+    f.write('P6\n{0} {1}\n255\n'.format(width, height).encode('ascii'))
+    rgb = bytearray(3 * width)
+    for row in rows:
+        rgb[0::3] = row.translate(red)
+        rgb[1::3] = row.translate(green)
+        rgb[2::3] = row.translate(blue)
+        f.write(rgb)
+
+
+def write_pgm(f, width, height, rows):
+    """Write palette rows as a binary (P5) grayscale PGM"""
+    gray = bytes(GRAY) + bytes(256 - len(GRAY))
+    f.write('P5\n{0} {1}\n255\n'.format(width, height).encode('ascii'))
+    for row in rows:
+        f.write(row.translate(gray))
+
+
+writers = {
+    'png': write_png,
+    'ppm': write_ppm,
+    'pgm': write_pgm,
+}
+
+
+def save_image(maze, path, cell_px=4, fmt=None):
+    """Save the maze with its last found path as an image.
+
+    Args:
+        maze (Maze):   The maze to draw.
+        path (str):    The image path.
+        cell_px (int): The size of a cell in pixels, including one wall.
+        fmt (str):     png, ppm or pgm - taken from the file extension if None.
+
+    """
+    fmt = fmt or path.rsplit('.', 1)[-1].lower()
+    if fmt not in writers:
+        raise ValueError("Unsupported image format: {0}".format(fmt))
+
+    width = maze.cols * cell_px + 1
+    height = maze.rows * cell_px + 1
+    with open(path, 'wb') as f:
+        writers[fmt](f, width, height, raster_rows(maze, cell_px))
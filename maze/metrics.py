@@ -0,0 +1,199 @@
+"""Metrics of building, generating, breaking and solving mazes.
+
+Recording is off by default. A phase then costs a single flag check and
+nothing at all is counted inside the generation and search loops. Once
+enabled, every phase - e.g. ('search', 'a*') - adds up its wall time and
+follows the step events of the generator or search it runs (see steps.py):
+
+    cells          cells carved or expanded
+    pushes, pops   entries added to and taken off a search's open lists
+    peak frontier  the largest open list/frontier seen at a step
+    peak bytes     the most memory allocated above the start of the phase,
+                   only with trace_allocations as tracemalloc slows
+                   everything down
+
+    metrics.recorder.enable()
+    maze.solve('a*')
+    print(metrics.recorder.to_prometheus())
+
+Phases don't nest, the peak of the allocations is reset when one starts.
+"""
+
+import json
+import time
+import contextlib
+import tracemalloc
+from steps import CARVED, EXPANDED, ROW, FRONTIER, STALE
+
+PREFIX = 'maze_phase_'
+
+# (name, prometheus type, help) of every exported stat
+STATS = (
+    ('calls', 'counter', "Number of times the phase ran"),
+    ('seconds', 'counter', "Wall time spent in the phase"),
+    ('cells', 'counter', "Cells carved or expanded"),
+    ('pushes', 'counter', "Entries pushed onto the open lists of a search"),
+    ('pops', 'counter', "Entries popped off the open lists of a search"),
+    ('peak_frontier', 'gauge', "Largest frontier or open list seen at a step"),
+    ('peak_bytes', 'gauge', "Most memory allocated during the phase, with allocation tracing"),
+)
+
+
+class PhaseStats:
+    """The totals of a phase over every time it ran"""
+
+    def __init__(self, phase, algorithm):
+        self.phase = phase
+        self.algorithm = algorithm
+        self.calls = 0
+        self.seconds = 0.0
+        self.cells = 0
+        self.pushes = 0
+        self.pops = 0
+        self.peak_frontier = 0
+        self.peak_bytes = 0
+
+    def as_dict(self):
+        stats = {'phase': self.phase, 'algorithm': self.algorithm}
+        for name, kind, _ in STATS:
+            stats[name] = getattr(self, name)
+        return stats
+
+    def merge(self, stats):
+        """Add the totals of a PhaseStats.as_dict(), e.g. from a worker process"""
+        for name, kind, _ in STATS:
+            if kind == 'gauge':
+                setattr(self, name, max(getattr(self, name), stats[name]))
+            else:
+                setattr(self, name, getattr(self, name) + stats[name])
+
+
+class Metrics:
+    """Records PhaseStats keyed by (phase, algorithm)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_allocations = False
+        self.phases = {}
+
+    def enable(self, trace_allocations=False):
+        self.enabled = True
+        self.trace_allocations = trace_allocations
+        if trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def disable(self):
+        self.enabled = False
+        if self.trace_allocations:
+            self.trace_allocations = False
+            tracemalloc.stop()
+
+    def reset(self):
+        self.phases = {}
+
+    def stats(self, phase, algorithm=''):
+        key = (phase, algorithm)
+        if key not in self.phases:
+            self.phases[key] = PhaseStats(phase, algorithm)
+        return self.phases[key]
+
+    def phase(self, phase, algorithm=''):
+        """Context manager timing a phase - gives its PhaseStats, or None while disabled"""
+        if not self.enabled:
+            return _DISABLED
+        return self._record(self.stats(phase, algorithm))
+
+    @contextlib.contextmanager
+    def _record(self, stats):
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.calls += 1
+            if self.trace_allocations:
+                stats.peak_bytes = max(stats.peak_bytes, tracemalloc.get_traced_memory()[1] - base)
+
+    def drain(self):
+        """The recorded stats as dicts, recording starts over - to ship them between processes"""
+        phases = [stats.as_dict() for stats in self.phases.values()]
+        self.reset()
+        return phases
+
+    def merge(self, phases):
+        """Add stats returned by drain()"""
+        for stats in phases:
+            self.stats(stats['phase'], stats['algorithm']).merge(stats)
+
+    def to_json(self):
+        return json.dumps([stats.as_dict() for stats in self.phases.values()], indent=2)
+
+    def to_prometheus(self):
+        """The stats in the Prometheus text exposition format"""
+        lines = []
+        for name, kind, text in STATS:
+            metric = PREFIX + name + ('_total' if kind == 'counter' else '')
+            lines.append("# HELP {0} {1}".format(metric, text))
+            lines.append("# TYPE {0} {1}".format(metric, kind))
+            for stats in self.phases.values():
+                lines.append('{0}{{phase="{1}",algorithm="{2}"}} {3}'.format(
+                    metric, stats.phase, stats.algorithm, getattr(stats, name)))
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path):
+        """Write the stats to a file - Prometheus text for .prom files, JSON otherwise"""
+        with open(path, 'w') as f:
+            f.write(self.to_prometheus() if path.endswith('.prom') else self.to_json())
+
+
+_DISABLED = contextlib.nullcontext()
+
+# the recorder of this process
+recorder = Metrics()
+
+
+def watch(steps, stats):
+    """Follow the step events of a generator or search into stats - steps as is if stats is None"""
+    if stats is None:
+        return steps
+    return _watch(steps, stats)
+
+
+def _watch(steps, stats):
+    frontiers = {}
+    cells = pops = peak = 0
+    try:
+        while True:
+            try:
+                event = next(steps)
+            except StopIteration as stop:
+                result = stop.value
+                break
+            kind = event[0]
+            if kind == EXPANDED or kind == STALE:
+                pops += 1
+                if kind == EXPANDED:
+                    cells += 1
+            elif kind == CARVED:
+                cells += 1
+            elif kind == ROW:
+                cells += event[2]
+            elif kind == FRONTIER:
+                frontiers[event[2]] = event[1]
+            if frontiers:
+                size = sum(map(len, frontiers.values()))
+                if size > peak:
+                    peak = size
+            yield event
+    finally:
+        steps.close()
+        stats.cells += cells
+        stats.peak_frontier = max(stats.peak_frontier, peak)
+        if pops:
+            # every entry pushed was either popped or is still queued
+            stats.pops += pops
+            stats.pushes += pops + sum(map(len, frontiers.values()))
+    return result
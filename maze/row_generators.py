@@ -0,0 +1,193 @@
+"""Maze generators that carve a whole row of cells at a time.
+
+A generator yields one carve row per maze row - a byte per cell holding the
+directions the cell opened itself towards (NORTH, EAST and/or SOUTH). The
+rows are turned into wall masks with bytes.translate, big integer ORs and
+slice assignments, so binary tree and sidewinder do their per-cell work at
+C speed and only Eller's needs a Python loop over the cells of a row. Every
+generator keeps O(cols) state besides the maze itself.
+"""
+
+import itertools
+from array import array
+from grid import NORTH, EAST, SOUTH, WEST, ALL_WALLS, or_bytes
+
+# carve bits of a neighbouring row/cell mapped onto the wall they remove here
+_FROM_ABOVE = bytes(NORTH if b & SOUTH else 0 for b in range(256))
+_FROM_BELOW = bytes(SOUTH if b & NORTH else 0 for b in range(256))
+_FROM_WEST = bytes(WEST if b & EAST else 0 for b in range(256))
+_FROM_EAST = bytes(EAST if b & WEST else 0 for b in range(256))
+_OWN = bytes(b & ALL_WALLS for b in range(256))
+_INVERT = bytes(~b & 0xFF for b in range(256))
+
+# a random byte picks NORTH or EAST for binary tree
+_NORTH_OR_EAST = bytes(NORTH if b & 1 else EAST for b in range(256))
+# a random byte continues a sidewinder run east or closes it
+_EAST_OR_CLOSE = bytes(EAST if b & 1 else 0 for b in range(256))
+_IS_ZERO = bytes(0 if b else 1 for b in range(256))
+
+
+def wall_row(walls, above, own, below):
+    """The wall masks of a row after carving.
+
+    Args:
+        walls (bytes): The current wall masks of the row.
+        above (bytes): The carve row above, or None for the first row.
+        own (bytes):   The carve row itself.
+        below (bytes): The carve row below, or None for the last row.
+
+    """
+    own = bytes(own)
+    removed = [own.translate(_OWN),
+               b'\0' + own[:-1].translate(_FROM_WEST),
+               own[1:].translate(_FROM_EAST) + b'\0']
+    if above is not None:
+        removed.append(bytes(above).translate(_FROM_ABOVE))
+    if below is not None:
+        removed.append(bytes(below).translate(_FROM_BELOW))
+    # clear the carved walls, keeping any edges already opened, i.e. start/exit
+    keep = or_bytes(*removed).translate(_INVERT)
+    return (int.from_bytes(walls, 'little') & int.from_bytes(keep, 'little')).to_bytes(len(own), 'little')
+
+
+def windows(carve_rows):
+    """Yield (above, own, below) for every carve row, one row behind so the row
+    below is known - above is None for the first row and below for the last"""
+    above = own = None
+    for below in carve_rows:
+        if own is not None:
+            yield above, own, below
+        above, own = own, below
+    if own is not None:
+        yield above, own, None
+
+
+def fill(grid, carve_rows):
+    """Carve the grid from carve rows.
+
+    Yields the index of every finished row.
+    """
+    cols = grid.cols
+    walls = grid.walls
+    for r, (above, own, below) in enumerate(windows(carve_rows)):
+        offset = r * cols
+        walls[offset:offset + cols] = wall_row(walls[offset:offset + cols], above, own, below)
+        yield r
+    grid.version += 1
+
+
+def binary_tree_rows(rows, cols, rng):
+    """Binary tree - every cell opens north or east at random.
+
+    The top row can only open east and the last column only north, which
+    leaves long corridors along both and a strong diagonal bias.
+    """
+    for r in range(rows):
+        if r == 0:
+            carve = bytearray([EAST]) * cols
+            carve[-1] = 0
+        else:
+            carve = bytearray(rng.randbytes(cols).translate(_NORTH_OR_EAST))
+            carve[-1] = NORTH
+        yield carve
+
+
+def sidewinder_rows(rows, cols, rng):
+    """Sidewinder - runs of cells joined east, each run opens north once.
+
+    Every cell continues its run east or closes it at random, a random cell of
+    a closed run then opens north. The top row is a single run.
+    """
+    for r in range(rows):
+        if r == 0:
+            carve = bytearray([EAST]) * cols
+            carve[-1] = 0
+            yield carve
+            continue
+
+        carve = bytearray(rng.randbytes(cols).translate(_EAST_OR_CLOSE))
+        carve[-1] = 0
+        picks = array('H', rng.randbytes(2 * cols))
+        start = 0
+        for end in itertools.compress(range(cols), carve.translate(_IS_ZERO)):
+            carve[start + (picks[end] * (end - start + 1) >> 16)] |= NORTH
+            start = end + 1
+        yield carve
+
+
+def eller_rows(rows, cols, rng):
+    """Eller's algorithm - a perfect maze one row at a time.
+
+    Cells of a row are labelled with the set they are connected to so far.
+    Neighbouring cells of different sets are joined east at random, then
+    every set opens south from at least one of its cells so no set is cut
+    off. The last row joins all remaining sets. Only the labels of a single
+    row are kept, so memory doesn't grow with the number of rows.
+    """
+    if rows == 0:
+        return
+    labels = list(range(cols))
+    next_label = cols
+    for _ in range(rows - 1):
+        carve, labels, next_label = _eller_row(labels, next_label, rng, cols)
+        yield carve
+    yield eller_last_row(labels)
+
+
+def _join_sets(labels, carve, joins):
+    """Join neighbouring cells of different sets east where the joins byte is odd.
+
+    Returns the cells of every set in the row by label.
+    """
+    members = {}
+    for c, label in enumerate(labels):
+        members.setdefault(label, []).append(c)
+
+    for c in range(len(labels) - 1):
+        a, b = labels[c], labels[c + 1]
+        if a != b and joins[c] & 1:
+            carve[c] |= EAST
+            # relabel the smaller set
+            if len(members[a]) < len(members[b]):
+                a, b = b, a
+            for p in members[b]:
+                labels[p] = a
+            members[a].extend(members.pop(b))
+    return members
+
+
+def _eller_row(labels, next_label, rng, cols):
+    """Join and open south one row - returns the carve row and the labels of the next row"""
+    carve = bytearray(cols)
+    members = _join_sets(labels, carve, rng.randbytes(cols))
+
+    next_labels = [-1] * cols
+    downs = rng.randbytes(cols)
+    for label, cells in members.items():
+        opened = [c for c in cells if downs[c] & 1]
+        if not opened:
+            opened = [cells[rng.randrange(len(cells))]]
+        for c in opened:
+            carve[c] |= SOUTH
+            next_labels[c] = label
+    for c in range(cols):
+        if next_labels[c] < 0:
+            next_labels[c] = next_label
+            next_label += 1
+    return carve, next_labels, next_label
+
+
+def eller_last_row(labels):
+    """Close off an Eller's maze - join every neighbouring pair of different sets"""
+    labels = list(labels)
+    carve = bytearray(len(labels))
+    _join_sets(labels, carve, b'\x01' * len(labels))
+    return carve
+
+
+# generators selectable with --maze-type
+row_generators = {
+    'binary-tree': binary_tree_rows,
+    'sidewinder': sidewinder_rows,
+    'eller': eller_rows,
+}
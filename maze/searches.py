@@ -1,27 +1,227 @@
+import math
+import time
 import collections
 import heapq as h
 import logging
+from array import array
+from grid import NORTH, EAST, SOUTH, WEST
+from steps import EXPANDED, FRONTIER, STALE, run
 
 
-def manhattan(curr, goal, dis=1):
+# the outcome of a path search - the path runs from the start to the exit cell
+# and is empty if the exit can't be reached, time is the wall time in seconds
+# and cost is the sum of the step costs along the path (its length on flat terrain)
+SearchResult = collections.namedtuple('SearchResult', ['name', 'path', 'length', 'expanded', 'time', 'cost'])
+
+
+class BucketQueue:
+    """Dial's bucket queue - O(1) push and pop for integer priorities.
+
+    Every priority pushed must lie within span of the lowest priority still
+    queued, as in Dijkstra's/A* where a step adds a small bounded cost. The
+    buckets are reused circularly so only span lists are ever allocated.
+
+    Args:
+        span (int): The number of distinct priorities queued at a time.
+
+    """
+
+    def __init__(self, span):
+        self.span = span
+        self.buckets = [[] for _ in range(span)]
+        self.current = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, priority, item, tie=0):
+        """Queue an item - tie is ignored, buckets pop LIFO (see TieBucketQueue)"""
+        # an emptied queue can be refilled in any order, e.g. by the first
+        # expanded cell, so the lowest bucket is tracked until the next pop
+        if not self.size or priority < self.current:
+            self.current = priority
+        self.buckets[priority % self.span].append(item)
+        self.size += 1
+
+    def pop(self):
+        """Pop an item with the lowest priority - returns (priority, item)"""
+        buckets = self.buckets
+        span = self.span
+        while not buckets[self.current % span]:
+            self.current += 1
+        self.size -= 1
+        return self.current, buckets[self.current % span].pop()
+
+
+class TieBucketQueue:
+    """Bucket queue breaking ties on a priority by a small integer, lowest first.
+
+    Every priority has a bucket as in BucketQueue, split into a list per tie.
+    A bytearray marks the ties queued in each bucket, so the lowest one is
+    found by a C level find from the lowest tie pushed rather than a loop
+    over empty lists. Entries with the same priority and tie pop LIFO.
+
+    Args:
+        span (int): The number of distinct priorities queued at a time.
+        ties (int): The number of distinct ties, 0 <= tie < ties.
+
+    """
+
+    def __init__(self, span, ties):
+        self.span = span
+        # the list of a tie only exists while it holds entries
+        self.buckets = [{} for _ in range(span)]
+        self.queued = [bytearray(ties) for _ in range(span)]
+        self.counts = [0] * span
+        self.lowest = [0] * span
+        self.current = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def push(self, priority, item, tie=0):
+        """Queue an item - among equal priorities the lowest tie pops first"""
+        if not self.size or priority < self.current:
+            self.current = priority
+        i = priority % self.span
+        if not self.counts[i] or tie < self.lowest[i]:
+            self.lowest[i] = tie
+        entries = self.buckets[i].get(tie)
+        if entries is None:
+            self.buckets[i][tie] = [item]
+            self.queued[i][tie] = 1
+        else:
+            entries.append(item)
+        self.counts[i] += 1
+        self.size += 1
+
+    def pop(self):
+        """Pop an item with the lowest priority and tie - returns (priority, item)"""
+        counts = self.counts
+        span = self.span
+        while not counts[self.current % span]:
+            self.current += 1
+        i = self.current % span
+        tie = self.queued[i].find(1, self.lowest[i])
+        self.lowest[i] = tie
+        entries = self.buckets[i][tie]
+        item = entries.pop()
+        if not entries:
+            del self.buckets[i][tie]
+            self.queued[i][tie] = 0
+        counts[i] -= 1
+        self.size -= 1
+        return self.current, item
+
+
+class HeapQueue:
+    """Binary heap with the same interface as BucketQueue, for any priorities"""
+
+    def __init__(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, priority, item, tie=0):
+        h.heappush(self.heap, (priority, tie, item))
+
+    def pop(self):
+        priority, tie, item = h.heappop(self.heap)
+        return priority, item
+
+
+def max_step_cost(grid):
+    """The highest cost of a single step, None if step costs aren't integers.
+
+    Every step costs 1 in a maze without a terrain layer.
+    """
+    costs = grid.costs
+    if costs is None:
+        return 1
+    if isinstance(costs, (bytes, bytearray)) or costs.typecode in 'bBhHiIlLqQ':
+        return max(costs)
+    return None
+
+
+def new_queue(grid, heuristic_step=0, ties=1):
+    """Open list for a best-first search - a bucket queue for integer step costs.
+
+    Args:
+        heuristic_step (int): The most the heuristic can change in a single step.
+        ties (int):           The number of distinct ties of the entries.
+
+    """
+    step = max_step_cost(grid)
+    if step is None:
+        return HeapQueue()
+    # a push is at most a step and the change in heuristic above the lowest entry
+    span = step + 2 * heuristic_step + 1
+    return TieBucketQueue(span, ties) if ties > 1 else BucketQueue(span)
+
+
+def manhattan(grid, curr, goal, dis=1):
     """Manhattan distance heuristic - tune dis"""
-    dx = abs(curr.x - goal.x)
-    dy = abs(curr.y - goal.y)
+    cx, cy = divmod(curr, grid.cols)
+    gx, gy = divmod(goal, grid.cols)
+    dx = abs(cx - gx)
+    dy = abs(cy - gy)
     return dis * (dx + dy)
 
 
-def gen_path(cell):
-    """Create a path for printing and calculate path length"""
-    cell.tmp_path = True
-    path_length = 0
-    while cell.parent:
-        cell = cell.parent
-        cell.tmp_path = True
-        path_length += 1
-    return path_length
+def new_parents(grid):
+    """Flat array of parent indices for a search - -1 means no parent"""
+    return array('i', [-1]) * grid.size
+
+
+def gen_path(parent, cell):
+    """Follow the parents back from a cell - returns the path from the start"""
+    path = [cell]
+    while parent[cell] >= 0:
+        cell = parent[cell]
+        path.append(cell)
+    path.reverse()
+    return path
+
+
+def path_cost(grid, path):
+    """Cost of walking a path - the sum of the costs of the cells stepped into"""
+    if grid.costs is None or not path:
+        return len(path) - 1
+    costs = grid.costs
+    return sum(costs[i] for i in path[1:])
+
+
+def search_result(name, grid, parent, curr, exit_cell, expanded, start_time):
+    """Build the result of a search and log it"""
+    path = gen_path(parent, curr) if curr == exit_cell else []
+    return path_result(name, grid, path, expanded, start_time)
+
+
+def path_result(name, grid, path, expanded, start_time):
+    """Build the result of a search from the found path and log it"""
+    elapsed = time.perf_counter() - start_time
+    path_length = len(path) - 1
+    cost = path_cost(grid, path)
+    logging.info("{0} path search: Expanded {1} cells".format(name, expanded))
+    logging.info("{0} path search: Path length = {1}".format(name, path_length))
+    if grid.costs is not None:
+        logging.info("{0} path search: Path cost = {1}".format(name, cost))
+    return SearchResult(name, path, path_length, expanded, elapsed, cost)
+
+
+def new_search(grid, start_cell, container):
+    """Shared start of BFS and DFS - returns (start time, parents, open list, visited set).
+
+    The two keep a plain loop next to their step events, as resuming a generator
+    costs about as much as one of their steps.
+    """
+    return time.perf_counter(), new_parents(grid), container([start_cell]), set()
 
 
-def bfs(start_cell, exit_cell, cell_list, rows, cols):
+def bfs(grid, start_cell, exit_cell):
     """Breadth First Search - neighbours added in N, E, S, W order.
 
     Remember we can add the neighbours to the visited collections
@@ -32,9 +232,8 @@ def bfs(start_cell, exit_cell, cell_list, rows, cols):
     We use a deque since it's O(1) for inserting at the head and
     popping - compared to lists O(n)!
     """
+    start_time, parent, unvisited_fifo, visited_fifo = new_search(grid, start_cell, collections.deque)
     expanded = 0
-    unvisited_fifo = collections.deque([start_cell])
-    visited_fifo = set()
 
     while len(unvisited_fifo):
         curr = unvisited_fifo.popleft()
@@ -45,9 +244,9 @@ def bfs(start_cell, exit_cell, cell_list, rows, cols):
             break
         visited_fifo.add(curr)
 
-        for neighbour in curr.path_neighbours():
+        for neighbour in grid.path_neighbours(curr):
             if neighbour not in visited_fifo:
-                neighbour.parent = curr
+                parent[neighbour] = curr
                 unvisited_fifo.append(neighbour)
                 # this looks weird but is an actual optimization
                 # we mark them as 'visited' or 'seen' so we don't
@@ -55,24 +254,75 @@ def bfs(start_cell, exit_cell, cell_list, rows, cols):
                 # previously this would add all its other neighbours!
                 visited_fifo.add(neighbour)
 
-    path_length = gen_path(curr)
-    print("BFS path search: Expanded {0} cells".format(expanded))
-    print("BFS path search: Path length = {0}".format(path_length))
+    return search_result("BFS", grid, parent, curr, exit_cell, expanded, start_time)
 
 
-def dfs(start_cell, exit_cell, cell_list, rows, cols):
+def bfs_steps(grid, start_cell, exit_cell):
+    """Breadth First Search as step events - the same search as bfs, see search_steps"""
+    start_time, parent, unvisited_fifo, visited_fifo = new_search(grid, start_cell, collections.deque)
+    expanded = 0
+    yield FRONTIER, unvisited_fifo, 0
+
+    while len(unvisited_fifo):
+        curr = unvisited_fifo.popleft()
+        expanded += 1
+        yield EXPANDED, curr, -1
+
+        if curr == exit_cell:
+            logging.debug("BFS path search: Exit found")
+            break
+        visited_fifo.add(curr)
+
+        for neighbour in grid.path_neighbours(curr):
+            if neighbour not in visited_fifo:
+                parent[neighbour] = curr
+                unvisited_fifo.append(neighbour)
+                # this looks weird but is an actual optimization
+                # we mark them as 'visited' or 'seen' so we don't
+                # expand many duplicate cells!
+                # previously this would add all its other neighbours!
+                visited_fifo.add(neighbour)
+
+    return search_result("BFS", grid, parent, curr, exit_cell, expanded, start_time)
+
+
+def dfs(grid, start_cell, exit_cell):
     """Depth first search - neighbours added in N, E, S, W order.
 
     Compared to BFS - we cannot add the neighbours to the visited
     set it will no longer be a DFS!
     """
-    unvisited_stack = [start_cell]
-    visited_stack = set()
+    start_time, parent, unvisited_stack, visited_stack = new_search(grid, start_cell, list)
+    expanded = 0
+
+    while unvisited_stack:
+        curr = unvisited_stack.pop()
+        expanded += 1
+        if curr == exit_cell:
+            logging.debug("DFS path search: Exit found")
+            break
+
+        if curr not in visited_stack:
+            visited_stack.add(curr)
+
+            for neighbour in grid.path_neighbours(curr):
+                if neighbour not in visited_stack:
+                    parent[neighbour] = curr
+                    unvisited_stack.append(neighbour)
+
+    return search_result("DFS", grid, parent, curr, exit_cell, expanded, start_time)
+
+
+def dfs_steps(grid, start_cell, exit_cell):
+    """Depth first search as step events - the same search as dfs, see search_steps"""
+    start_time, parent, unvisited_stack, visited_stack = new_search(grid, start_cell, list)
     expanded = 0
+    yield FRONTIER, unvisited_stack, 0
 
     while unvisited_stack:
         curr = unvisited_stack.pop()
         expanded += 1
+        yield EXPANDED, curr, -1
         if curr == exit_cell:
             logging.debug("DFS path search: Exit found")
             break
@@ -80,33 +330,48 @@ def dfs(start_cell, exit_cell, cell_list, rows, cols):
         if curr not in visited_stack:
             visited_stack.add(curr)
 
-            for neighbour in curr.path_neighbours():
+            for neighbour in grid.path_neighbours(curr):
                 if neighbour not in visited_stack:
-                    neighbour.parent = curr
+                    parent[neighbour] = curr
                     unvisited_stack.append(neighbour)
 
-    # create a path for printing
-    path_length = gen_path(curr)
-    print("DFS path search: Expanded {0} cells".format(expanded))
-    print("DFS path search: Path length = {0}".format(path_length))
+    return search_result("DFS", grid, parent, curr, exit_cell, expanded, start_time)
 
 
-def ucs(start_cell, exit_cell, cell_list, rows, cols):
+def ucs(grid, start_cell, exit_cell):
+    """Uniform cost search - returns a SearchResult, see ucs_steps"""
+    return run(ucs_steps(grid, start_cell, exit_cell))
+
+
+def ucs_steps(grid, start_cell, exit_cell):
     """Uniform cost search - Dijkstra's algorithm
 
-    Actually, because of the 4-movement maze,
-    UCS will perform like BFS due to path cost == 1
+    A step costs the terrain cost of the cell stepped into, without a terrain
+    layer every step costs 1 and UCS performs like BFS.
+
+    With integer step costs the open list is a bucket queue (Dial's algorithm)
+    so pushes and pops are O(1), otherwise it falls back to a heap. Entries of
+    already expanded cells are skipped when popped.
     """
-    start_cell.ucs_cost = 0
+    start_time = time.perf_counter()
+    parent = new_parents(grid)
+    # accumulated path costs - only the cells reached are stored
+    ucs_cost = {start_cell: 0}
+    closed = bytearray(grid.size)
+    costs = grid.costs
     expanded = 0
 
-    total_cells = len(cell_list[0])*len(cell_list)
-    visited = set()
-    unvisited = [(0, start_cell)]
+    unvisited = new_queue(grid)
+    unvisited.push(0, start_cell)
+    yield FRONTIER, unvisited, 0
 
-    while len(visited) < total_cells:
-        ucs_cost, curr = h.heappop(unvisited)
+    while unvisited:
+        cost, curr = unvisited.pop()
+        if closed[curr]:
+            yield STALE, curr, -1
+            continue
         expanded += 1
+        yield EXPANDED, curr, -1
 
         # break if we have found the exit
         # this will be always the shortest path to exit
@@ -115,42 +380,46 @@ def ucs(start_cell, exit_cell, cell_list, rows, cols):
         if curr == exit_cell:
             logging.debug("UCS path search: Exit found")
             break
+        closed[curr] = 1
 
         # get neighbours and calculate costs
-        g_cost = curr.ucs_cost + 1
-        for n in curr.path_neighbours():
-            if n not in visited:
-                # replace the larger of the accumulated path cost
-                if n.ucs_cost > g_cost:
-                    n.ucs_cost = g_cost
-                n.parent = curr
-                h.heappush(unvisited, (n.ucs_cost, n))
+        for n in grid.path_neighbours(curr):
+            g_cost = cost + costs[n] if costs is not None else cost + 1
+            # replace the larger of the accumulated path cost
+            if not closed[n] and g_cost < ucs_cost.get(n, math.inf):
+                ucs_cost[n] = g_cost
+                parent[n] = curr
+                unvisited.push(g_cost, n)
+
+    return search_result("UCS", grid, parent, curr, exit_cell, expanded, start_time)
 
-        # mark as visited
-        visited.add(curr)
 
-    # create a path for printing
-    path_length = gen_path(curr)
-    print("UCS path search: Expanded {0} cells".format(expanded))
-    print("UCS path search: Path length = {0}".format(path_length))
+def gs(grid, start_cell, exit_cell):
+    """Greedy search - returns a SearchResult, see gs_steps"""
+    return run(gs_steps(grid, start_cell, exit_cell))
 
 
-def gs(start_cell, exit_cell, cell_list, rows, cols):
+def gs_steps(grid, start_cell, exit_cell):
     """Greedy search using manhattan distance
 
     Remember, A* deteriorates into Greedy search when g(n) = 0
     i.e. f(n) = h(n)
+
+    Among neighbours equally close to the exit the cheaper terrain is taken.
     """
-    start_cell.ucs_cost = 0
+    start_time = time.perf_counter()
+    parent = new_parents(grid)
+    costs = grid.costs
     expanded = 0
 
-    total_cells = len(cell_list[0])*len(cell_list)
     visited = set()
-    unvisited = [(0, start_cell)]
+    unvisited = [(0, 0, start_cell)]
+    yield FRONTIER, unvisited, 0
 
-    while len(visited) < total_cells:
-        ucs_cost, curr = h.heappop(unvisited)
+    while unvisited:
+        h_cost, step, curr = h.heappop(unvisited)
         expanded += 1
+        yield EXPANDED, curr, -1
 
         # break if we have found the exit
         # this will be always the shortest path to exit
@@ -161,73 +430,404 @@ def gs(start_cell, exit_cell, cell_list, rows, cols):
             break
 
         # get neighbours and calculate costs
-        for n in curr.path_neighbours():
+        for n in grid.path_neighbours(curr):
             if n not in visited:
-                n.parent = curr
-                h_cost = manhattan(n, exit_cell)
-                h.heappush(unvisited, (h_cost, n))
+                parent[n] = curr
+                h_cost = manhattan(grid, n, exit_cell)
+                step = costs[n] if costs is not None else 1
+                h.heappush(unvisited, (h_cost, step, n))
 
         # mark as visited
         visited.add(curr)
 
-    # create a path for printing
-    path_length = gen_path(curr)
-    print("Greedy path search: Expanded {0} cells".format(expanded))
-    print("Greedy path search: Path length = {0}".format(path_length))
+    return search_result("Greedy", grid, parent, curr, exit_cell, expanded, start_time)
+
+
+def astar(grid, start_cell, exit_cell, heuristic=manhattan, tiebreak=True):
+    """A* search - returns a SearchResult, see astar_steps"""
+    return run(astar_steps(grid, start_cell, exit_cell, heuristic, tiebreak))
+
 
+def astar_steps(grid, start_cell, exit_cell, heuristic=manhattan, tiebreak=True):
+    """A* search - Manhattan distance by default due to maze restriction
 
-def astar(start_cell, exit_cell, cell_list, rows, cols, tiebreak=False):
-    """A* search with Manhattan distance due to maze restriction
+    f(n) = g(n) + h(n)
 
-    f(n) = g(n) + h(h)
+    g(n): path cost from the start to the neighbour n
+    h(n): heuristic approximation from the neighbour n to the exit
 
-    g(n): path cost
-    h(n): heuristic approximation
+    A step costs the terrain cost of the cell stepped into, 1 by default.
+    The heuristic must be consistent (never overestimate a single step) for the
+    first path to the exit to be the cheapest, which holds for manhattan as
+    terrain costs are at least 1.
+    Cells can be pushed more than once when a cheaper path to them turns up, so
+    entries of already expanded cells are skipped when popped (lazy deletion).
+
+    Tiebreak prefers the entry with the lower h(n) among equal f(n), i.e. the
+    one closer to the exit, which avoids expanding every equal cost path.
+
+    With integer step costs and the manhattan heuristic f(n) is an integer that
+    never drops below the last popped one, so the open list is a bucket queue -
+    split by h(n) within every f(n) for the tiebreak. Other heuristics fall
+    back to a heap.
+
+    Args:
+        heuristic (function): heuristic(grid, cell, exit_cell) estimating the
+                              remaining path cost.
+        tiebreak (bool):      Break ties on f(n) by h(n).
 
-    Tiebreak is implemented to create bias for current picked path if there are equal paths
     """
-    start_cell.ucs_cost = 0
+    start_time = time.perf_counter()
+    parent = new_parents(grid)
+    g_costs = {start_cell: 0}
+    closed = bytearray(grid.size)
+    costs = grid.costs
     expanded = 0
 
-    total_cells = len(cell_list[0])*len(cell_list)
-    visited = set()
-    unvisited = [(0, start_cell)]
-
-    while len(visited) < total_cells:
-        astar_cost, curr = h.heappop(unvisited)
+    # a step changes manhattan by at most 1, so f(n) grows by at most a step cost + 1,
+    # and h(n) is below rows + cols - 1
+    if heuristic is manhattan:
+        unvisited = new_queue(grid, 1, grid.rows + grid.cols - 1 if tiebreak else 1)
+    else:
+        unvisited = HeapQueue()
+    h_cost = heuristic(grid, start_cell, exit_cell)
+    # the queue breaks ties on h(n) - never with the tiebreak off
+    unvisited.push(h_cost, start_cell, h_cost if tiebreak else 0)
+    yield FRONTIER, unvisited, 0
+
+    while unvisited:
+        f_cost, curr = unvisited.pop()
+
+        # stale entry - the cell was already expanded via a cheaper path
+        if closed[curr]:
+            yield STALE, curr, -1
+            continue
         expanded += 1
+        yield EXPANDED, curr, -1
 
-        # break if we have found the exit
-        # this will be always the shortest path to exit
-        # due to the priority queue and checking only after
-        # all neighbours have been pushed!
+        # with a consistent heuristic the first time the exit is popped
+        # it has been reached by the shortest path
         if curr == exit_cell:
             logging.debug("A* path search: Exit found")
             break
+        closed[curr] = 1
 
-        # f(n) = g(n) + h(n) == f_cost
-        g_cost = curr.ucs_cost + 1
-        h_cost = manhattan(curr, exit_cell)
-        h_cost *= (1.0 + 1/1000) if tiebreak else h_cost
-        f_cost = g_cost + h_cost
+        g_curr = g_costs[curr]
+        for n in grid.path_neighbours(curr):
+            g_cost = g_curr + costs[n] if costs is not None else g_curr + 1
+            if not closed[n] and g_cost < g_costs.get(n, math.inf):
+                g_costs[n] = g_cost
+                parent[n] = curr
+                # f(n) = g(n) + h(n) of the neighbour
+                h_cost = heuristic(grid, n, exit_cell)
+                unvisited.push(g_cost + h_cost, n, h_cost if tiebreak else 0)
 
-        for n in curr.path_neighbours():
-            if n not in visited:
-                # replace the larger of the accumulated path cost
-                if n.ucs_cost > g_cost:
-                    n.ucs_cost = g_cost
-                n.parent = curr
-                # we use the f(n) cost for sorting in the priority queue
-                h.heappush(unvisited, (f_cost, n))
-        logging.debug([(n[0], n[1].coords) for n in unvisited])
+    return search_result("A*", grid, parent, curr, exit_cell, expanded, start_time)
+
+
+def join_paths(parent_fwd, parent_bwd, meet):
+    """Join the forward path to the meeting cell with the backward path from it"""
+    path = gen_path(parent_fwd, meet)
+    cell = meet
+    while parent_bwd[cell] >= 0:
+        cell = parent_bwd[cell]
+        path.append(cell)
+    return path
+
+
+def bfs_bi(grid, start_cell, exit_cell):
+    """Bidirectional Breadth First Search - returns a SearchResult, see bfs_bi_steps"""
+    return run(bfs_bi_steps(grid, start_cell, exit_cell))
+
+
+def bfs_bi_steps(grid, start_cell, exit_cell):
+    """Bidirectional Breadth First Search - grows a frontier from both the start
+    and the exit cell and stops when they meet.
+
+    A whole level of the smaller frontier is expanded at a time. Every edge
+    reaching a cell the other side has seen is a candidate path and the
+    shortest candidate found while finishing the level is returned, so the
+    path length is the same as for BFS.
+    """
+    start_time = time.perf_counter()
+    expanded = 0
+    parent_fwd = new_parents(grid)
+    parent_bwd = new_parents(grid)
+    # distance from the start/exit - -1 means not seen by that side
+    dist_fwd = array('i', [-1]) * grid.size
+    dist_bwd = array('i', [-1]) * grid.size
+    dist_fwd[start_cell] = 0
+    dist_bwd[exit_cell] = 0
+    frontier_fwd = [start_cell]
+    frontier_bwd = [exit_cell]
+    yield FRONTIER, frontier_fwd, 0
+    yield FRONTIER, frontier_bwd, 1
+
+    best = math.inf
+    meet = start_cell if start_cell == exit_cell else -1
+
+    while meet < 0 and frontier_fwd and frontier_bwd:
+        # expand the smaller side
+        if len(frontier_fwd) <= len(frontier_bwd):
+            frontier, dist, parent, other_dist = frontier_fwd, dist_fwd, parent_fwd, dist_bwd
+        else:
+            frontier, dist, parent, other_dist = frontier_bwd, dist_bwd, parent_bwd, dist_fwd
+
+        next_frontier = []
+        for curr in frontier:
+            expanded += 1
+            yield EXPANDED, curr, -1
+            d = dist[curr] + 1
+            for n in grid.path_neighbours(curr):
+                if dist[n] < 0:
+                    dist[n] = d
+                    parent[n] = curr
+                    next_frontier.append(n)
+                    if other_dist[n] >= 0 and d + other_dist[n] < best:
+                        best = d + other_dist[n]
+                        meet = n
+
+        if frontier is frontier_fwd:
+            frontier_fwd = next_frontier
+            yield FRONTIER, frontier_fwd, 0
+        else:
+            frontier_bwd = next_frontier
+            yield FRONTIER, frontier_bwd, 1
+
+    if meet >= 0:
+        logging.debug("Bidirectional BFS path search: Frontiers met")
+    path = join_paths(parent_fwd, parent_bwd, meet) if meet >= 0 else []
+    return path_result("Bidirectional BFS", grid, path, expanded, start_time)
+
+
+def astar_bi(grid, start_cell, exit_cell, heuristic=manhattan):
+    """Bidirectional A* search - returns a SearchResult, see astar_bi_steps"""
+    return run(astar_bi_steps(grid, start_cell, exit_cell, heuristic))
 
-        # mark as visited
-        visited.add(curr)
 
-    # create a path for printing
-    path_length = gen_path(curr)
-    print("A* path search: Expanded {0} cells".format(expanded))
-    print("A* path search: Path length = {0}".format(path_length))
+def astar_bi_steps(grid, start_cell, exit_cell, heuristic=manhattan):
+    """Bidirectional A* search - a forward search towards the exit and a backward
+    search towards the start, each expanding from the smaller open list.
+
+    A step costs the terrain cost of the cell stepped into, so the backward
+    search pays for the cell it steps out of.
+
+    best is the cost of the shortest path found through a cell reached by both
+    sides. With a consistent heuristic any shorter path would have to go through
+    an open cell with f(n) below best, so the search stops as soon as either
+    open list has nothing cheaper than best left.
+    """
+    start_time = time.perf_counter()
+    expanded = 0
+    parents = (new_parents(grid), new_parents(grid))
+    g_costs = ({start_cell: 0}, {exit_cell: 0})
+    closed = (bytearray(grid.size), bytearray(grid.size))
+    costs = grid.costs
+    goals = (exit_cell, start_cell)
+    open_lists = ([(heuristic(grid, start_cell, exit_cell), start_cell)],
+                  [(heuristic(grid, exit_cell, start_cell), exit_cell)])
+    yield FRONTIER, open_lists[0], 0
+    yield FRONTIER, open_lists[1], 1
+
+    meet = start_cell if start_cell == exit_cell else -1
+    best = 0 if meet >= 0 else math.inf
+
+    while open_lists[0] and open_lists[1]:
+        if open_lists[0][0][0] >= best or open_lists[1][0][0] >= best:
+            break
+
+        side = 0 if len(open_lists[0]) <= len(open_lists[1]) else 1
+        unvisited = open_lists[side]
+        g_side, g_other = g_costs[side], g_costs[1 - side]
+        closed_side = closed[side]
+        parent = parents[side]
+        goal = goals[side]
+
+        f_cost, curr = h.heappop(unvisited)
+        # stale entry - the cell was already expanded via a cheaper path
+        if closed_side[curr]:
+            yield STALE, curr, -1
+            continue
+        closed_side[curr] = 1
+        expanded += 1
+        yield EXPANDED, curr, -1
+
+        g_curr = g_side[curr]
+        for n in grid.path_neighbours(curr):
+            if costs is None:
+                g_cost = g_curr + 1
+            else:
+                g_cost = g_curr + (costs[n] if side == 0 else costs[curr])
+            if not closed_side[n] and g_cost < g_side.get(n, math.inf):
+                g_side[n] = g_cost
+                parent[n] = curr
+                h.heappush(unvisited, (g_cost + heuristic(grid, n, goal), n))
+                # a path through n exists if the other side reached it
+                if n in g_other and g_cost + g_other[n] < best:
+                    best = g_cost + g_other[n]
+                    meet = n
+
+    if meet >= 0:
+        logging.debug("Bidirectional A* path search: Frontiers met")
+    path = join_paths(parents[0], parents[1], meet) if meet >= 0 else []
+    return path_result("Bidirectional A*", grid, path, expanded, start_time)
+
+
+def jps(grid, start_cell, exit_cell):
+    """Jump Point Search - returns a SearchResult, see jps_steps"""
+    return run(jps_steps(grid, start_cell, exit_cell))
+
+
+def jps_steps(grid, start_cell, exit_cell):
+    """Jump Point Search - A* over jump points of the 4-connected maze.
+
+    Shortest paths are taken to go vertical first and only turn vertical again
+    off a horizontal run where they have to, i.e. where the cell above or below
+    can't be reached by turning one cell earlier. A horizontal jump runs until
+    such a forced turn, a vertical jump also stops where a horizontal jump from
+    it would find a jump point. Only jump points are pushed, so straight runs
+    through open rooms and corridors cost no queue operations at all.
+
+    Every jump point after the first is expanded in the direction it was
+    reached plus the two perpendicular ones. The path length is the same as
+    for BFS. Jump points assume every step costs the same, with a terrain
+    layer this falls back to A*.
+    """
+    if grid.costs is not None:
+        return (yield from astar_steps(grid, start_cell, exit_cell))
+
+    start_time = time.perf_counter()
+    walls = grid.walls
+    cols = grid.cols
+    neighbour = grid.neighbour
+    parent = new_parents(grid)
+    g_costs = {start_cell: 0}
+    closed = bytearray(grid.size)
+    expanded = 0
+
+    def move(i, d):
+        """The cell one step from i in direction d, -1 if a wall is in the way"""
+        return -1 if walls[i] & d else neighbour(i, d)
+
+    def forced(prev, i, d, turn):
+        """Whether turning at i is forced, i.e. i + turn can't be reached via prev + turn"""
+        if move(i, turn) < 0:
+            return False
+        side = move(prev, turn)
+        return side < 0 or move(side, d) < 0
+
+    def jump_horizontal(i, d):
+        """Walk east/west from i, returns the first jump point or -1"""
+        prev, i = i, move(i, d)
+        while i >= 0:
+            if i == exit_cell or forced(prev, i, d, NORTH) or forced(prev, i, d, SOUTH):
+                return i
+            prev, i = i, move(i, d)
+        return -1
+
+    def jump_vertical(i, d):
+        """Walk north/south from i, returns the first jump point or -1"""
+        prev, i = i, move(i, d)
+        while i >= 0:
+            if i == exit_cell or forced(prev, i, d, EAST) or forced(prev, i, d, WEST):
+                return i
+            if jump_horizontal(i, EAST) >= 0 or jump_horizontal(i, WEST) >= 0:
+                return i
+            prev, i = i, move(i, d)
+        return -1
+
+    unvisited = HeapQueue()
+    h_cost = manhattan(grid, start_cell, exit_cell)
+    unvisited.push(h_cost, start_cell, h_cost)
+    yield FRONTIER, unvisited, 0
+
+    while unvisited:
+        f_cost, curr = unvisited.pop()
+
+        # stale entry - the cell was already expanded via a cheaper path
+        if closed[curr]:
+            yield STALE, curr, -1
+            continue
+        expanded += 1
+        yield EXPANDED, curr, -1
+
+        if curr == exit_cell:
+            logging.debug("JPS path search: Exit found")
+            break
+        closed[curr] = 1
+
+        # prune the directions by the one the jump point was reached in
+        p = parent[curr]
+        if p < 0:
+            directions = (NORTH, EAST, SOUTH, WEST)
+        elif curr - p >= cols or p - curr >= cols:
+            d = SOUTH if curr > p else NORTH
+            directions = (d, EAST, WEST)
+        else:
+            d = EAST if curr > p else WEST
+            directions = (d, NORTH, SOUTH)
+
+        g_curr = g_costs[curr]
+        for d in directions:
+            n = jump_vertical(curr, d) if d & (NORTH | SOUTH) else jump_horizontal(curr, d)
+            if n < 0 or closed[n]:
+                continue
+            # jump points lie in a straight line - the manhattan distance is the path cost
+            g_cost = g_curr + manhattan(grid, curr, n)
+            if g_cost < g_costs.get(n, math.inf):
+                g_costs[n] = g_cost
+                parent[n] = curr
+                h_cost = manhattan(grid, n, exit_cell)
+                unvisited.push(g_cost + h_cost, n, h_cost)
+
+    path = []
+    if curr == exit_cell:
+        # fill in the straight runs between the jump points
+        points = gen_path(parent, curr)
+        path = [points[0]]
+        for a, b in zip(points, points[1:]):
+            step = (cols if abs(b - a) >= cols else 1) * (1 if b > a else -1)
+            path.extend(range(a + step, b + step, step))
+    return path_result("JPS", grid, path, expanded, start_time)
+
+
+# path searches selectable with --search-type
+path_searches = {
+    'dfs': dfs,
+    'bfs': bfs,
+    'ucs': ucs,
+    'a*': astar,
+    'gs': gs,
+    'bfs-bi': bfs_bi,
+    'a*-bi': astar_bi,
+    'jps': jps
+}
+
+
+def corridor_steps(grid, start_cell, exit_cell):
+    """Corridor search as step events on a corridor graph built for the call,
+    Maze.solve_steps uses the cached Maze.corridor_graph instead"""
+    # corridor.py builds on this module
+    import corridor
+    graph = corridor.CorridorGraph(grid, (start_cell, exit_cell))
+    return (yield from graph.search_steps(start_cell, exit_cell))
+
+
+# the same searches as step events, and the corridor search - a
+# (steps.EXPANDED, cell, -1) tuple per expanded cell, (steps.STALE, cell, -1)
+# per skipped entry and a steps.FRONTIER event per open list, the SearchResult
+# is the return value of the generator
+search_steps = {
+    'dfs': dfs_steps,
+    'bfs': bfs_steps,
+    'ucs': ucs_steps,
+    'a*': astar_steps,
+    'gs': gs_steps,
+    'bfs-bi': bfs_bi_steps,
+    'a*-bi': astar_bi_steps,
+    'jps': jps_steps,
+    'corridor': corridor_steps
+}
 
 
 def binary_search(l, item):
@@ -0,0 +1,75 @@
+"""Step events of maze generation and path searches.
+
+Generators and searches are written as Python generators yielding a small
+(kind, cell, other) tuple per step and returning their result, so they can be
+animated, capped or cancelled step by step. run() drives them to the end when
+nobody is watching, which costs little more than calling them directly. Only
+BFS and DFS, whose steps cost about as much as resuming a generator, keep a
+plain loop next to their step events.
+"""
+
+import time
+
+# a cell was carved out of the maze - other is the cell it was reached from,
+# the wall between the two was broken
+CARVED = 0
+# a search expanded a cell - other is -1
+EXPANDED = 1
+# a whole row was carved at once - cell is the first cell of the row, other is
+# the number of cells in it
+ROW = 2
+# the open list of a search or the frontier of a generator - cell is the
+# container itself, other its slot, 0 or 1 for searches with two frontiers.
+# Sent once when the container is created so a watcher can sample its size
+FRONTIER = 3
+# a search popped an entry of an already expanded cell - other is -1
+STALE = 4
+
+# how many steps are taken between checks of the clock
+CLOCK_EVERY = 256
+
+
+class StepLimitExceeded(RuntimeError):
+    """Raised by run() when the step budget or the timeout is used up"""
+
+    def __init__(self, message, steps, elapsed):
+        super().__init__(message)
+        self.steps = steps
+        self.elapsed = elapsed
+
+
+def run(steps, max_steps=None, timeout=None):
+    """Run step events to the end and return the result of the generator.
+
+    Args:
+        steps (generator): The step events, e.g. of searches.bfs_steps().
+        max_steps (int):   Give up after this many steps - the generator is
+                           never resumed past its last step in the budget.
+        timeout (float):   Give up after this many seconds.
+
+    Raises StepLimitExceeded if either limit is hit, the generator is closed.
+    """
+    if max_steps is None and timeout is None:
+        while True:
+            try:
+                next(steps)
+            except StopIteration as stop:
+                return stop.value
+
+    start = time.perf_counter()
+    deadline = start + timeout if timeout is not None else None
+    limit = max_steps if max_steps is not None else float('inf')
+    count = 0
+    while True:
+        # the budget is checked before resuming, so no step past it runs
+        if count >= limit or (deadline is not None and count % CLOCK_EVERY == 0
+                              and time.perf_counter() > deadline):
+            steps.close()
+            elapsed = time.perf_counter() - start
+            raise StepLimitExceeded("Stopped after {0} steps in {1:.3f}s".format(count, elapsed),
+                                    count, elapsed)
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+        count += 1
@@ -0,0 +1,121 @@
+"""Streaming generation - a maze written out row by row as it is carved.
+
+The row generators (see row_generators.py) keep O(cols) state, so a maze can
+be generated straight into a text rendering or a binary maze file without
+ever building its Grid. Only a window of three carve rows is held at a time,
+which makes the height of the maze limited by disk space rather than memory:
+
+    $ python maze --maze-type eller --dimension 10000000 200 --stream big.maze
+
+The output is the same as generating the maze with Maze.generate and the
+same seed, then rendering it or saving it with maze_file.
+"""
+
+import sys
+import random
+import logging
+import maze_file
+import row_generators
+from grid import NORTH, EAST, SOUTH, WEST, ALL_WALLS, outer_edge
+
+# '#' stands in for the block drawn at the start/exit openings, see Maze.render_lines
+_BLOCK = ord('#')
+_BLOCK_CHAR = u"\u2588"
+_NORTH_EDGE = bytes(ord('-') if b & NORTH else ord(' ') for b in range(256))
+_TOP_EDGE = bytes(ord('-') if b & NORTH else _BLOCK for b in range(256))
+_BOTTOM_EDGE = bytes(ord('-') if b & SOUTH else _BLOCK for b in range(256))
+_WEST_EDGE = bytes(ord('|') if b & WEST else ord(' ') for b in range(256))
+
+
+def wall_rows(rows, cols, start_coords, exit_coords, carve_rows):
+    """Turn carve rows into the wall masks of every row, opening the start and exit"""
+    openings = {}
+    for coords in (start_coords, exit_coords):
+        d = outer_edge(rows, cols, coords)
+        if d:
+            openings.setdefault(coords[0], []).append((coords[1], d))
+
+    closed = bytes([ALL_WALLS]) * cols
+    for r, (above, own, below) in enumerate(row_generators.windows(carve_rows)):
+        walls = closed
+        if r in openings:
+            walls = bytearray(closed)
+            for c, d in openings[r]:
+                walls[c] &= ~d
+        yield row_generators.wall_row(walls, above, own, below)
+
+
+def _edge_line(walls, edge):
+    """A line of corners and horizontal walls - two characters of edge per cell"""
+    chars = walls.translate(edge)
+    line = bytearray(b'+') * (3 * len(walls) + 1)
+    line[1::3] = chars
+    line[2::3] = chars
+    return line.decode('ascii').replace('#', _BLOCK_CHAR)
+
+
+def render(cols, start_coords, exit_coords, walls, stream=None):
+    """Write the text rendering of wall rows to a file-like object, stdout by default.
+
+    The lines are the same as Maze.render_lines of the maze without a path,
+    but built with bytes translations rather than a string per wall segment.
+    """
+    if stream is None:
+        stream = sys.stdout
+    start = start_coords[0] * cols + start_coords[1]
+    exit = exit_coords[0] * cols + exit_coords[1]
+
+    last = None
+    for r, row in enumerate(walls):
+        row = bytes(row)
+        first = _edge_line(row, _TOP_EDGE if r == 0 else _NORTH_EDGE)
+
+        # middle row - west wall and the cell itself, only start/exit open the west edge
+        second = bytearray(b' ') * (3 * cols)
+        second[0::3] = row.translate(_WEST_EDGE)
+        if not row[0] & WEST:
+            second[0] = _BLOCK
+        # east edge of the last cell
+        i = r * cols + cols - 1
+        if row[-1] & EAST:
+            east = '|'
+        elif i == exit:
+            east = _BLOCK_CHAR + ' Exit'
+        elif i == start:
+            east = _BLOCK_CHAR + ' Start'
+        else:
+            east = ' '
+        second = second.decode('ascii').replace('#', _BLOCK_CHAR) + east
+
+        stream.write(first + '\n' + second + '\n')
+        last = row
+
+    # the south edge, only start/exit open it
+    if last is not None:
+        stream.write(_edge_line(last, _BOTTOM_EDGE) + '\n')
+
+
+def generate(maze_type, rows, cols, start_coords, exit_coords, seed=None, path=None, stream=None):
+    """Generate a maze with a row generator straight to a file.
+
+    Args:
+        maze_type (str): binary-tree, sidewinder or eller.
+        seed (int):      Seed for the random generator, drawn at random if None.
+        path (str):      Save the maze in the binary maze format to this file.
+        stream (file):   Otherwise write the text rendering here, stdout by default.
+
+    Returns the seed.
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    rng = random.Random(seed)
+    logging.info("Streaming {0} maze of {1}x{2} cells, seed: {3}".format(maze_type, rows, cols, seed))
+
+    carve_rows = row_generators.row_generators[maze_type](rows, cols, rng)
+    walls = wall_rows(rows, cols, start_coords, exit_coords, carve_rows)
+    if path is not None:
+        with open(path, 'wb') as f:
+            maze_file.write_rows(f, rows, cols, start_coords, exit_coords, seed, walls)
+    else:
+        render(cols, start_coords, exit_coords, walls, stream)
+    return seed
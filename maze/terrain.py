@@ -0,0 +1,133 @@
+"""Terrain layers - the cost of stepping into each cell of a maze.
+
+The costs of a maze are one flat array indexed like the wall masks. Integer
+costs of 1 to 255 are kept in a bytearray, anything else in an array('d').
+Costs are never below 1 so manhattan distance stays an admissible heuristic.
+"""
+
+import operator
+from array import array
+
+MIN_COST = 1
+MAX_BYTE_COST = 255
+
+
+def _check_range(low, high):
+    if not MIN_COST <= low <= high <= MAX_BYTE_COST:
+        raise ValueError("Terrain costs must satisfy {0} <= low <= high <= {1}".format(MIN_COST, MAX_BYTE_COST))
+
+
+def uniform(rows, cols, rng, low=1, high=9):
+    """Independent random costs between low and high for every cell.
+
+    Random bytes are mapped onto the cost range with a translation table, so
+    the work is done at C speed whatever the size of the maze.
+    """
+    _check_range(low, high)
+    levels = high - low + 1
+    table = bytes(low + (b * levels >> 8) for b in range(256))
+    return bytearray(rng.randbytes(rows * cols).translate(table))
+
+
+def noise(rows, cols, rng, low=1, high=9, scale=16, octaves=3):
+    """Smooth, Perlin-like value noise - patches of cheap and costly terrain.
+
+    Every octave interpolates random values on a lattice of scale cells (halved
+    per octave, with half the weight) with a smoothstep. The octaves are summed
+    row by row, so only a few rows of floats are alive at a time.
+
+    Args:
+        scale (int):   The lattice spacing in cells of the coarsest octave.
+        octaves (int): The number of octaves summed up.
+
+    """
+    _check_range(low, high)
+    layers = []
+    total_weight = 0.0
+    for k in range(octaves):
+        step = max(1, scale >> k)
+        weight = 0.5 ** k
+        total_weight += weight
+        lattice = [[weight * rng.random() for _ in range(cols // step + 2)]
+                   for _ in range(rows // step + 2)]
+        # horizontal lattice column and smoothstep weight of every cell column
+        columns = [c // step for c in range(cols)]
+        fractions = [(c % step) / step for c in range(cols)]
+        smooth = [t * t * (3 - 2 * t) for t in fractions]
+        layers.append((step, lattice, columns, smooth))
+
+    levels = high - low + 1
+    costs = bytearray(rows * cols)
+    for r in range(rows):
+        total = None
+        for step, lattice, columns, smooth in layers:
+            t = (r % step) / step
+            t = t * t * (3 - 2 * t)
+            above, below = lattice[r // step], lattice[r // step + 1]
+            line = [a + (b - a) * t for a, b in zip(above, below)]
+            values = [line[i] + (line[i + 1] - line[i]) * w for i, w in zip(columns, smooth)]
+            total = values if total is None else list(map(operator.add, total, values))
+        # the sum stays below total_weight - scale it onto the cost levels
+        factor = levels / total_weight
+        costs[r * cols:(r + 1) * cols] = bytes(low + min(levels - 1, int(v * factor)) for v in total)
+    return costs
+
+
+def load(path, rows, cols):
+    """Load the costs of a rows x cols maze from a file.
+
+    .txt and .csv files hold whitespace or comma separated numbers row by row,
+    any other file is taken as raw bytes - one cost per cell.
+    """
+    size = rows * cols
+    if path.endswith(('.txt', '.csv')):
+        with open(path) as f:
+            values = [float(v) for v in f.read().replace(',', ' ').split()]
+        if all(v.is_integer() and 0 <= v <= MAX_BYTE_COST for v in values):
+            costs = bytearray(int(v) for v in values)
+        else:
+            costs = array('d', values)
+    else:
+        with open(path, 'rb') as f:
+            costs = bytearray(f.read())
+    return validate(costs, size)
+
+
+def save(costs, path):
+    """Save costs readable by load() - the extension picks the format as for load().
+
+    .txt and .csv files get the costs as text, any other file raw bytes, which
+    only holds integer costs kept in a bytearray.
+    """
+    if path.endswith(('.txt', '.csv')):
+        with open(path, 'w') as f:
+            f.write(' '.join(repr(v) for v in costs))
+    elif isinstance(costs, (bytes, bytearray)):
+        with open(path, 'wb') as f:
+            f.write(costs)
+    else:
+        raise ValueError("Terrain costs that aren't bytes can only be saved to a .txt or .csv file, "
+                         "not {0}".format(path))
+
+
+def validate(costs, size):
+    """Check the costs cover every cell and never drop below MIN_COST"""
+    if len(costs) != size:
+        raise ValueError("Terrain has {0} costs for {1} cells".format(len(costs), size))
+    if size and min(costs) < MIN_COST:
+        raise ValueError("Terrain costs must be at least {0}".format(MIN_COST))
+    return costs
+
+
+# terrains selectable with --terrain, anything else is a file path
+terrains = {
+    'uniform': uniform,
+    'noise': noise,
+}
+
+
+def generate(terrain_type, rows, cols, rng, low=1, high=9):
+    """Generate the terrain selected by --terrain, or load it from a file"""
+    if terrain_type in terrains:
+        return terrains[terrain_type](rows, cols, rng, low, high)
+    return load(terrain_type, rows, cols)